@@ -0,0 +1,237 @@
+"""Backtest the signal logic over archives of labeled chart screenshots
+
+Images are streamed straight out of a directory, .zip or .tar(.gz/.bz2/.xz)
+archive without extracting them, analyzed with detect_candles and
+generate_prediction on a process pool, and compared with a label file of
+next-candle outcomes. One JSON line is written per image as results arrive,
+followed by a summary line with accuracy, per-pattern hit rates and
+throughput, so memory stays bounded however large the archive is.
+
+Labels are a CSV (image,outcome) or JSONL ({"image": ..., "outcome": ...})
+file. Outcomes may be CALL/PUT, up/down, green/red or bullish/bearish and
+images are matched by archive path or by file name.
+
+Usage:
+    python backtest.py screenshots.tar.gz --labels labels.csv
+    python backtest.py shots/ --labels labels.jsonl --workers 8 --output results.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ghostcore import ALLOWED_EXTENSIONS, GhostCoreAI, decode_image
+
+OUTCOME_ALIASES = {
+    'call': 'CALL', 'up': 'CALL', 'green': 'CALL', 'bullish': 'CALL', 'buy': 'CALL', '1': 'CALL',
+    'put': 'PUT', 'down': 'PUT', 'red': 'PUT', 'bearish': 'PUT', 'sell': 'PUT', '0': 'PUT', '-1': 'PUT',
+}
+
+
+def is_image(name):
+    return name.lower().endswith(ALLOWED_EXTENSIONS)
+
+
+def iter_images(path):
+    """Yield (name, encoded bytes) for every image in a directory, zip or tar archive"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if is_image(filename):
+                    full = os.path.join(root, filename)
+                    with open(full, 'rb') as f:
+                        yield os.path.relpath(full, path), f.read()
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        # Stream mode reads members in order without seeking or an index
+        with tarfile.open(path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and is_image(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"Not a directory, zip or tar archive: {path}")
+
+
+def normalize_outcome(value):
+    return OUTCOME_ALIASES.get(str(value).strip().lower())
+
+
+def load_labels(path):
+    """Map image path and file name to the next-candle outcome (CALL or PUT)"""
+    labels = {}
+    with open(path, newline='') as f:
+        if path.lower().endswith(('.jsonl', '.json')):
+            rows = ((row.get('image'), row.get('outcome')) for row in map(json.loads, filter(str.strip, f)))
+        else:
+            rows = (row[:2] for row in csv.reader(f) if len(row) >= 2)
+        for image, outcome in rows:
+            outcome = normalize_outcome(outcome)
+            if image and outcome:
+                labels[image] = outcome
+                labels.setdefault(os.path.basename(image), outcome)
+    return labels
+
+
+def label_for(labels, name):
+    return labels.get(name, labels.get(os.path.basename(name)))
+
+
+_worker_ai = None
+
+
+def _init_worker(work_height, roi_detection, extractor, lookback, progressive):
+    """Create one analyzer per worker process, with caches off"""
+    global _worker_ai
+    _worker_ai = GhostCoreAI(workers=1, cache_size=0, debug_store_size=0,
+                             work_height=work_height, roi_detection=roi_detection, extractor=extractor,
+                             lookback=lookback, progressive=progressive)
+
+
+def _backtest_image(name, buf):
+    """Worker entry point: decode, detect and score one screenshot"""
+    image = decode_image(buf)
+    if image is None or image.ndim != 3 or image.shape[2] != 3:
+        return {"image": name, "error": "Could not load image"}
+    try:
+        frame, _ = _worker_ai.normalize(image)
+        candles = _worker_ai.detect_candles(frame)
+        prediction = _worker_ai.generate_prediction(candles, frame)
+    except Exception as e:
+        return {"image": name, "error": f"Analysis failed: {str(e)}"}
+    return {
+        "image": name,
+        "signal": prediction.get("signal"),
+        "confidence": prediction.get("confidence", 0),
+        "pattern": prediction.get("pattern", "None"),
+        "candle_count": len(candles),
+    }
+
+
+class BacktestSummary:
+    """Running totals over scored images"""
+
+    def __init__(self):
+        self.images = 0
+        self.errors = 0
+        self.unlabeled = 0
+        self.no_signal = 0
+        self.signals = 0
+        self.hits = 0
+        self.patterns = {}
+        self.started = time.perf_counter()
+
+    def add(self, result, label):
+        """Fold one result in and return it annotated with its label and correctness"""
+        self.images += 1
+        if "error" in result:
+            self.errors += 1
+            return result
+        result["label"] = label
+        if label is None:
+            self.unlabeled += 1
+        elif result["signal"] not in ('CALL', 'PUT'):
+            self.no_signal += 1
+        else:
+            correct = result["signal"] == label
+            result["correct"] = correct
+            self.signals += 1
+            self.hits += correct
+            stats = self.patterns.setdefault(result["pattern"], [0, 0])
+            stats[0] += 1
+            stats[1] += correct
+        return result
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "images": self.images,
+            "errors": self.errors,
+            "unlabeled": self.unlabeled,
+            "no_signal": self.no_signal,
+            "signals": self.signals,
+            "hits": self.hits,
+            "accuracy": round(self.hits / self.signals, 4) if self.signals else None,
+            "patterns": {
+                pattern: {"signals": signals, "hits": hits, "hit_rate": round(hits / signals, 4)}
+                for pattern, (signals, hits) in sorted(self.patterns.items())
+            },
+            "elapsed_seconds": round(elapsed, 3),
+            "images_per_second": round(self.images / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+def run_backtest(archives, labels, out, workers=None, work_height=720, roi_detection=True,
+                 extractor='contours', lookback=8, progressive=False):
+    """Score every image in the archives, writing JSONL to out; returns the summary dict
+
+    At most a few images per worker are in flight, and results are written in
+    archive order as soon as they are ready.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = BacktestSummary()
+    pending = deque()
+
+    def emit(future):
+        result = future.result()
+        result = summary.add(result, label_for(labels, result["image"]))
+        out.write(json.dumps(result) + "\n")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(work_height, roi_detection, extractor, lookback, progressive)) as pool:
+        for path in archives:
+            for name, buf in iter_images(path):
+                pending.append(pool.submit(_backtest_image, name, buf))
+                if len(pending) >= workers * 4:
+                    emit(pending.popleft())
+        while pending:
+            emit(pending.popleft())
+
+    result = summary.to_dict()
+    out.write(json.dumps({"summary": result}) + "\n")
+    out.flush()
+    return result
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('archives', nargs='+', help='directories, .zip or .tar archives of screenshots')
+    parser.add_argument('--labels', required=True, help='CSV or JSONL file of next-candle outcomes')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--output', default='-', help='JSONL output path (default: stdout)')
+    parser.add_argument('--work-height', type=int, default=720, help='analysis height, 0 disables downscaling')
+    parser.add_argument('--no-roi', action='store_true', help='disable chart-area detection')
+    parser.add_argument('--extractor', default='contours', choices=GhostCoreAI.EXTRACTORS,
+                        help='candle extractor (profile also measures wicks)')
+    parser.add_argument('--lookback', type=int, default=8,
+                        help='candles kept per chart, 0 keeps all (deep trend and levels past 8)')
+    parser.add_argument('--progressive', action='store_true',
+                        help='scan from the right edge and stop once the lookback is filled')
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args.labels)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        summary = run_backtest(args.archives, labels, out, workers=args.workers,
+                               work_height=args.work_height or None, roi_detection=not args.no_roi,
+                               extractor=args.extractor, lookback=args.lookback or None,
+                               progressive=args.progressive)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{summary['images']} images, accuracy {summary['accuracy']}, "
+          f"{summary['images_per_second']} images/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,85 @@
+"""Allocation and peak-RSS report for the pipeline buffer pool
+
+Runs the same request mix in two fresh interpreters, one with the buffer
+pool disabled (every scratch array allocated per call, as before the pool)
+and one with it enabled. Each request analyzes a chart and renders its
+overlay. Reported per mode: pooled-buffer allocations and MiB allocated per
+request after warm-up, peak RSS, RSS growth over the measured requests and
+mean latency.
+
+Usage:
+    python benchmarks/bench_buffers.py
+    python benchmarks/bench_buffers.py --requests 200 --sizes 1280x720,1920x1080
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, resource, sys, time
+sys.path.insert(0, BENCH)
+from ghostcore import GhostCoreAI
+from synthetic import render_chart
+
+def rss_mib():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+
+frames = [render_chart(width=w, height=h, candles=min(40, w // 30), seed=i)[0]
+          for i, (w, h) in enumerate(SIZES)]
+ai = GhostCoreAI(cache_size=0, buffer_shapes=SHAPES)
+
+def request(i):
+    prediction = ai.analyze_array(frames[i % len(frames)])
+    ai.render_debug_image(prediction['analysis_id'])
+
+for i in range(WARMUP):
+    request(i)
+before = ai.buffers.stats()
+rss_start = rss_mib()
+start = time.perf_counter()
+for i in range(REQUESTS):
+    request(i)
+elapsed = time.perf_counter() - start
+after = ai.buffers.stats()
+print(json.dumps({
+    "allocations_per_request": (after['allocations'] - before['allocations']) / REQUESTS,
+    "mib_allocated_per_request": (after['allocated_bytes'] - before['allocated_bytes']) / REQUESTS / 2 ** 20,
+    "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "rss_growth_mib": rss_mib() - rss_start,
+    "ms_per_request": elapsed / REQUESTS * 1000,
+}))
+'''
+
+
+def run_mode(shapes, sizes, requests, warmup):
+    code = (CHILD.replace('BENCH', repr(os.path.join(REPO, 'benchmarks')))
+            .replace('SIZES', repr(sizes)).replace('SHAPES', repr(shapes))
+            .replace('REQUESTS', repr(requests)).replace('WARMUP', repr(warmup)))
+    env = dict(os.environ, PYTHONPATH=REPO)
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--sizes', default='1280x720,1920x1080,2560x1440')
+    args = parser.parse_args()
+    sizes = [tuple(int(v) for v in size.split('x')) for size in args.sizes.split(',')]
+
+    print(f"{'mode':>10}  {'allocs/req':>10}  {'MiB/req':>8}  {'peak RSS':>9}  {'RSS growth':>10}  {'ms/req':>7}")
+    for label, shapes in (('no pool', 0), ('pool', 2)):
+        result = run_mode(shapes, sizes, args.requests, args.warmup)
+        print(f"{label:>10}  {result['allocations_per_request']:10.1f}  {result['mib_allocated_per_request']:8.2f}"
+              f"  {result['peak_rss_mib']:7.1f} M  {result['rss_growth_mib']:8.1f} M  {result['ms_per_request']:7.2f}")
+
+
+if __name__ == '__main__':
+    main()
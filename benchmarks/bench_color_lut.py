@@ -0,0 +1,69 @@
+"""Compare the HSV-threshold colour classifier with the fused lookup-table path
+
+Usage: python benchmarks/bench_color_lut.py [--repeat N] [--size WxH ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ghostcore import classify_colors, color_lut, hsv_color_masks
+from synthetic import render_chart
+
+
+def clean_mask(mask):
+    """The open/close/open sequence detect_candles applies to each mask"""
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN,
+                            cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1)))
+
+
+def legacy_path(blurred):
+    """Previous detect_candles masking: HSV conversion, boosts and inRange"""
+    return [clean_mask(mask) for mask in hsv_color_masks(blurred)]
+
+
+def lut_path(blurred):
+    """Current detect_candles masking: one table lookup for both masks"""
+    return [clean_mask(mask) for mask in cv2.split(classify_colors(blurred))]
+
+
+def best_of(func, arg, repeat):
+    """Fastest wall-clock time of repeat calls, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--size', nargs='*', default=['1280x720', '1920x1080', '2560x1440', '3840x2160'])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    color_lut()
+    print(f"LUT build: {(time.perf_counter() - start) * 1000:.0f} ms (once per process)")
+    print(f"{'size':>10} {'hsv ms':>9} {'lut ms':>9} {'speedup':>8}  identical")
+
+    for size in args.size:
+        width, height = (int(v) for v in size.lower().split('x'))
+        image, _ = render_chart(width, height, candles=60)
+        blurred = cv2.GaussianBlur(image, (3, 3), 0)
+        identical = all(np.array_equal(a, b) for a, b in zip(legacy_path(blurred), lut_path(blurred)))
+        legacy_ms = best_of(legacy_path, blurred, args.repeat)
+        lut_ms = best_of(lut_path, blurred, args.repeat)
+        print(f"{size:>10} {legacy_ms:9.2f} {lut_ms:9.2f} {legacy_ms / lut_ms:7.2f}x  {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Overload report for the deadline scheduler
+
+Submits analyses of distinct synthetic charts at a fixed arrival rate, each
+with a deadline a few seconds after it arrives, to a DeadlineScheduler in
+three configurations: no fallback (every job runs the full path or is
+dropped), fallback only when a job can no longer make its deadline in full,
+and fallback whenever degrade_depth jobs are waiting. Reported per mode: jobs
+finished on time, late, dropped and degraded, and the median and p95 time
+from arrival to result of the jobs that finished.
+
+Usage:
+    python benchmarks/bench_deadlines.py
+    python benchmarks/bench_deadlines.py --rate 150 --jobs 600 --budget 1.5
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import render_chart
+
+from ghostcore import DeadlineScheduler, GhostCoreAI
+
+
+def run_mode(charts, rate, jobs, budget, fallback, degrade_depth, workers):
+    full = GhostCoreAI(cache_size=0, debug_store_size=1)
+    fast = GhostCoreAI(cache_size=0, debug_store_size=0, work_height=480)
+    full.warm_up()
+    fast.warm_up()
+    scheduler = DeadlineScheduler(workers, queue_depth=jobs, degrade_depth=degrade_depth)
+    latencies = []
+    lock = threading.Lock()
+    done = threading.Semaphore(0)
+
+    def finished(arrival):
+        def callback(future):
+            if future.exception() is None:
+                with lock:
+                    latencies.append(time.time() - arrival)
+            done.release()
+        return callback
+
+    start = time.time()
+    for i in range(jobs):
+        # Open-loop arrivals: job i arrives at i / rate whatever the backlog
+        delay = start + i / rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        buf = charts[i % len(charts)]
+        arrival = time.time()
+        future = scheduler.submit(full.analyze_bytes, buf, deadline=arrival + budget,
+                                  fallback=(lambda buf=buf: fast.analyze_bytes(buf, debug=False)) if fallback else None)
+        future.add_done_callback(finished(arrival))
+    for _ in range(jobs):
+        done.acquire()
+    scheduler.shutdown()
+    stats = scheduler.stats()
+    latencies.sort()
+    stats['p50_ms'] = statistics.median(latencies) * 1000 if latencies else None
+    stats['p95_ms'] = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=100, help='arrivals per second')
+    parser.add_argument('--jobs', type=int, default=400)
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds from arrival to deadline')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    charts = [cv2.imencode('.png', render_chart(width=1920, height=1080, seed=seed)[0])[1].tobytes()
+              for seed in range(16)]
+    modes = (('no fallback', False, None), ('late only', True, None), ('depth 4', True, 4))
+    print(f"{'mode':>12}  {'on time':>7}  {'late':>5}  {'dropped':>7}  {'degraded':>8}  {'p50 ms':>7}  {'p95 ms':>7}")
+    for label, fallback, depth in modes:
+        stats = run_mode(charts, args.rate, args.jobs, args.budget, fallback, depth, args.workers)
+        p50 = f"{stats['p50_ms']:7.0f}" if stats['p50_ms'] is not None else f"{'-':>7}"
+        p95 = f"{stats['p95_ms']:7.0f}" if stats['p95_ms'] is not None else f"{'-':>7}"
+        print(f"{label:>12}  {stats['on_time']:>7}  {stats['late']:>5}  {stats['dropped']:>7}"
+              f"  {stats['degraded']:>8}  {p50}  {p95}")
+
+
+if __name__ == '__main__':
+    main()
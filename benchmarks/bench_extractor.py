@@ -0,0 +1,69 @@
+"""Compare the contour and column-profile candle extractors on synthetic charts
+
+For each theme and noise level, reports detection latency, the fraction of
+detected bodies matching the ground truth and, for the profile extractor,
+the worst wick-tip error in pixels.
+
+Usage:
+    python benchmarks/bench_extractor.py
+    python benchmarks/bench_extractor.py --size 1920x1080 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ghostcore import GhostCoreAI
+from synthetic import match_rate, render_chart
+
+CASES = [('dark', 0.0), ('light', 0.0), ('classic', 0.0), ('dark', 6.0), ('light', 8.0)]
+
+
+def median_ms(func, repeat):
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def wick_error(candles, truth, tolerance=3):
+    """Largest |high - wick_top| or |low - wick_bottom| over candles matched by x"""
+    worst = 0
+    for candle in candles:
+        for true in truth:
+            if candle['type'] == true['type'] and abs(candle['x'] - true['x']) <= tolerance:
+                worst = max(worst, abs(candle['high'] - true['wick_top']), abs(candle['low'] - true['wick_bottom']))
+                break
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split('x'))
+
+    analyzers = {name: GhostCoreAI(cache_size=0, work_height=None, extractor=name)
+                 for name in GhostCoreAI.EXTRACTORS}
+    print(f"{'theme':>8} {'noise':>5}  {'contours ms':>11} {'match':>6}  {'profile ms':>10} {'match':>6} {'wick err':>8}")
+    for seed, (theme, noise) in enumerate(CASES):
+        image, truth = render_chart(width, height, candles=min(40, width // 30), theme=theme, noise=noise, seed=seed)
+        row = f"{theme:>8} {noise:5.1f}"
+        for name, ai in analyzers.items():
+            candles = list(ai.detect_candles(image))
+            elapsed = median_ms(lambda: ai.detect_candles(image), args.repeat)
+            row += f"  {elapsed:{len(name) + 3}.2f} {match_rate(candles, truth):6.2f}"
+            if name == 'profile':
+                row += f" {wick_error(candles, truth):8d}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
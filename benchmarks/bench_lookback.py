@@ -0,0 +1,55 @@
+"""Scoring latency as the candle count grows, default vs deep lookback
+
+Renders zoomed-out charts with more and more candles, detects them once
+with lookback 8 and once keeping every candle, and times detection and
+generate_prediction separately. With the sort-based support/resistance and
+the regression trend, scoring stays in the same range however many candles
+are kept. The profile extractor is the default: at the 720 working height
+the contour extractor's closing merges bodies packed closer than ~9 px.
+
+Usage:
+    python benchmarks/bench_lookback.py
+    python benchmarks/bench_lookback.py --counts 40,120,240 --repeats 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import render_chart
+
+from ghostcore import GhostCoreAI
+
+
+def best_ms(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', default='20,60,120,200')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--extractor', default='profile', choices=GhostCoreAI.EXTRACTORS)
+    args = parser.parse_args()
+
+    print(f"{'candles':>7}  {'lookback':>8}  {'kept':>5}  {'detect ms':>9}  {'score ms':>8}  {'trend':>10}  level")
+    for count in map(int, args.counts.split(',')):
+        image = render_chart(width=1920, height=1080, candles=count, seed=count)[0]
+        for lookback in (8, None):
+            ai = GhostCoreAI(cache_size=0, debug_store_size=0, lookback=lookback, extractor=args.extractor)
+            frame, _ = ai.normalize(image)
+            detect_ms, candles = best_ms(lambda: ai.detect_candles(frame), args.repeats)
+            score_ms, prediction = best_ms(lambda: ai.generate_prediction(candles, frame), args.repeats)
+            print(f"{count:>7}  {str(lookback):>8}  {len(candles):>5}  {detect_ms:9.2f}  {score_ms:8.3f}"
+                  f"  {prediction.get('trend', '-'):>10}  {prediction.get('support_resistance', '-')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Full-width vs progressive (right-to-left) candle detection
+
+Renders charts of growing width at a fixed height, the way a zoomed-out
+chart packs more history into the same screen, and times detect_candles on
+the working-resolution frame with and without progressive scanning. It also
+checks that both return the same candles.
+
+Usage:
+    python benchmarks/bench_progressive.py
+    python benchmarks/bench_progressive.py --extractor profile --repeats 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import render_chart
+
+from ghostcore import GhostCoreAI
+
+# (width, candles, seed, chrome) at 1080 rows; the candle spacing stays the same.
+# Then regression cases: crowded candles that merge into blobs sharing one
+# center_x, which gives no spacing to size the next window from, and sparse
+# charts with fewer candles than the lookback, where no window is enough
+CHARTS = ((1920, 40, 40, False), (2880, 60, 60, False), (3840, 80, 80, False), (5760, 120, 120, False),
+          (3840, 120, 1, True), (1920, 6, 6, False), (2560, 5, 5, False), (3840, 7, 7, True))
+
+
+def best_ms(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--extractor', default='contours', choices=GhostCoreAI.EXTRACTORS)
+    args = parser.parse_args()
+
+    full = GhostCoreAI(cache_size=0, extractor=args.extractor)
+    progressive = GhostCoreAI(cache_size=0, extractor=args.extractor, progressive=True)
+    print(f"{'chart':>17}  {'full ms':>8}  {'progressive ms':>14}  {'speedup':>7}  same")
+    for width, count, seed, chrome in CHARTS:
+        image = render_chart(width=width, height=1080, candles=count, seed=seed, chrome=chrome)[0]
+        frame, _ = full.normalize(image)
+        frame = frame.copy()
+        full_ms, expected = best_ms(lambda: full.detect_candles(frame), args.repeats)
+        progressive_ms, candles = best_ms(lambda: progressive.detect_candles(frame), args.repeats)
+        same = expected.data.shape == candles.data.shape and bool((expected.data == candles.data).all())
+        label = f"{width}x1080{'+chrome' if chrome else ''}"
+        print(f"{label:>17}  {full_ms:8.2f}  {progressive_ms:14.2f}  {full_ms / progressive_ms:6.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Non-chart triage: rejection accuracy and the pipeline time it saves
+
+Runs ChartTriage over synthetic charts (every theme, with and without UI
+chrome, sparse and dense, multi-panel) and over screenshots that are not
+charts (blank, noise, gradient, a face-like photo, documents, a settings
+page with coloured buttons). Charts must all pass and non-charts should all
+be rejected. Each image is also timed through the full pipeline, which is
+what a rejection saves.
+
+Usage:
+    python benchmarks/bench_triage.py
+    python benchmarks/bench_triage.py --repeats 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import THEMES, render_chart, render_panels
+
+from ghostcore import ChartTriage, GhostCoreAI
+
+WORDS = ('order', 'balance', 'profit', 'account', 'deposit', 'market', 'report', 'the', 'and', 'of',
+         'withdrawal', 'pending', 'signal', 'history', 'settings', 'support', 'trade', 'total')
+
+
+def charts():
+    for theme in THEMES:
+        for chrome in (False, True):
+            suffix = '+chrome' if chrome else ''
+            yield f'{theme}{suffix}', render_chart(1920, 1080, theme=theme, chrome=chrome, noise=3)[0]
+            yield f'{theme}{suffix} sparse', render_chart(1280, 720, candles=6, theme=theme, chrome=chrome)[0]
+            yield f'{theme}{suffix} dense', render_chart(1920, 1080, candles=120, theme=theme, chrome=chrome)[0]
+    yield 'panels 2x2', render_panels()[0]
+
+
+def text_page(color, rng):
+    page = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+    for row in range(38):
+        line = ' '.join(rng.choice(WORDS, size=rng.integers(4, 12)))
+        cv2.putText(page, line, (int(rng.integers(30, 120)), 30 + row * 27),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+    return page
+
+
+def non_charts():
+    rng = np.random.default_rng(0)
+    yield 'blank', np.full((1080, 1920, 3), 255, dtype=np.uint8)
+    yield 'noise', rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+
+    gradient = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    gradient[:, :, 1] = np.linspace(0, 255, 1080)[:, None]
+    gradient[:, :, 2] = np.linspace(0, 255, 1920)[None, :]
+    yield 'gradient', gradient
+
+    face = np.full((1080, 1920, 3), (200, 180, 160), dtype=np.uint8)
+    cv2.ellipse(face, (960, 540), (300, 400), 0, 0, 360, (140, 170, 225), -1)
+    for x in (860, 1060):
+        cv2.circle(face, (x, 450), 30, (40, 40, 40), -1)
+    cv2.ellipse(face, (960, 700), (100, 30), 0, 0, 180, (60, 60, 200), -1)
+    yield 'face photo', face
+
+    yield 'document', text_page((20, 20, 20), rng)
+    yield 'red error log', text_page((40, 40, 220), rng)
+
+    settings = text_page((90, 90, 90), rng)
+    cv2.rectangle(settings, (100, 900), (400, 980), (80, 175, 38), -1)
+    cv2.rectangle(settings, (500, 900), (800, 980), (70, 60, 235), -1)
+    yield 'settings page', settings
+
+
+def best_ms(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    triage = ChartTriage()
+    ai = GhostCoreAI(cache_size=0, debug_store_size=0)
+    ai.warm_up()
+    wrong = 0
+    print(f"{'image':>22}  {'expected':>8}  {'triage':>22}  {'triage ms':>9}  {'pipeline ms':>11}")
+    for expected, images in (('chart', charts()), ('reject', non_charts())):
+        for name, image in images:
+            triage_ms, reason = best_ms(lambda: triage.check(image), args.repeats)
+            pipeline_ms, _ = best_ms(lambda: ai.analyze_array(image, debug=False), args.repeats)
+            wrong += (reason is None) != (expected == 'chart')
+            print(f"{name:>22}  {expected:>8}  {reason or 'pass':>22}  {triage_ms:9.2f}  {pipeline_ms:11.2f}")
+    print(f"misclassified: {wrong}")
+
+
+if __name__ == '__main__':
+    main()
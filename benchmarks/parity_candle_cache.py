@@ -0,0 +1,97 @@
+"""Near-duplicate candle cache vs fresh analysis on barely changed resubmissions
+
+Analyzes synthetic charts, then resubmits each with its newest candle grown
+up or down by a few pixels (a live chart a moment later), recompressed as
+JPEG, and with a clock drawn into the corner. Every resubmission is
+analyzed by an analyzer whose candle cache holds the original and by one
+without caches; the predictions must match. Also reports how many
+resubmissions the cache still served. JPEG recompression adds only noise,
+so every JPEG resubmission must be served from the cache and match the
+original's prediction; fresh analysis of the JPEG itself can differ when
+the noise moves contours, which is counted separately.
+
+Usage:
+    python benchmarks/parity_candle_cache.py
+    python benchmarks/parity_candle_cache.py --charts 100 --extractor profile
+"""
+import argparse
+import os
+import sys
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import THEMES, render_chart
+
+from ghostcore import GhostCoreAI
+
+KEYS = ('signal', 'confidence', 'signal_strength', 'pattern', 'trend', 'momentum', 'support_resistance')
+GROWTHS = (8, 16, -8, -16)  # Pixels added above (positive) or below the newest body
+EXPECTED_HITS = ('jpeg',)  # Resubmissions the candle cache must serve
+
+
+def resubmissions(image, truth, theme):
+    """(kind, image) pairs derived from a rendered chart"""
+    last = truth[-1]
+    color = THEMES[theme][last['type']]
+    x, y, width, height = last['x'], last['y'], last['width'], last['height']
+    for grow in GROWTHS:
+        grown = image.copy()
+        if grow > 0:
+            cv2.rectangle(grown, (x, y - grow), (x + width - 1, y - 1), color, -1)
+        else:
+            cv2.rectangle(grown, (x, y + height), (x + width - 1, y + height - grow - 1), color, -1)
+        yield 'grown', grown
+    yield 'jpeg', cv2.imdecode(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])[1], cv2.IMREAD_COLOR)
+    clock = image.copy()
+    cv2.putText(clock, '12:34:56', (5, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+    yield 'clock', clock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--charts', type=int, default=60)
+    parser.add_argument('--extractor', default='contours', choices=GhostCoreAI.EXTRACTORS)
+    args = parser.parse_args()
+
+    cached = GhostCoreAI(cache_size=256, debug_store_size=0, extractor=args.extractor)
+    fresh = GhostCoreAI(cache_size=0, debug_store_size=0, extractor=args.extractor)
+    counts = {}
+    mismatches = 0
+    misses = 0
+    drifted = 0
+    for seed in range(args.charts):
+        theme = list(THEMES)[seed % len(THEMES)]
+        image, truth = render_chart(candles=30, seed=seed, theme=theme, chrome=seed % 2 == 1)
+        for kind, resubmitted in resubmissions(image, truth, theme):
+            # Start every resubmission from a cache holding only the original
+            cached.candle_cache.clear()
+            cached.analyze_array(image, debug=False)
+            served = cached.candle_cache.hits - cached.stale_candle_hits
+            expected = fresh.analyze_array(resubmitted, debug=False)
+            if kind in EXPECTED_HITS:
+                original = fresh.analyze_array(image, debug=False)
+                drifted += any(expected.get(key) != original.get(key) for key in KEYS)
+                expected = original
+            actual = cached.analyze_array(resubmitted, debug=False)
+            served = cached.candle_cache.hits - cached.stale_candle_hits - served
+            total, hits = counts.get(kind, (0, 0))
+            counts[kind] = (total + 1, hits + served)
+            if kind in EXPECTED_HITS and not served:
+                misses += 1
+                print(f"seed {seed} {kind}: not served from the candle cache")
+            if any(expected.get(key) != actual.get(key) for key in KEYS):
+                mismatches += 1
+                print(f"seed {seed} {kind}: fresh {expected.get('signal')}/{expected.get('pattern')}, "
+                      f"cached {actual.get('signal')}/{actual.get('pattern')}")
+
+    for kind, (total, hits) in counts.items():
+        print(f"{kind:>6}: {hits} of {total} served from the candle cache")
+    print(f"mismatches: {mismatches}")
+    print(f"expected hits missed: {misses}")
+    print(f"fresh analysis changed by JPEG noise: {drifted}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Parity and throughput check for GhostCoreAI.score_windows
+
+Builds random candle series (with and without measured wicks, small integer
+ranges so threshold ties are common), scores every sliding window with
+score_windows and with generate_prediction on the same window, and reports
+any window whose signal, confidence, strength or pattern, momentum, trend
+or level code differs, followed by windows/s for both paths. Exits non-zero
+on a mismatch.
+
+Usage:
+    python benchmarks/parity_score_windows.py
+    python benchmarks/parity_score_windows.py --candles 20000 --work-height 1080
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ghostcore import CandleSet, GhostCoreAI
+from ghostcore.history import LEVEL_NAMES, MOMENTUM_NAMES, PATTERN_NAMES, SIGNAL_NAMES, TREND_NAMES
+
+
+def random_series(count, seed, wicks):
+    rng = np.random.default_rng(seed)
+    heights = rng.integers(1, 40, count)
+    widths = rng.integers(1, 12, count)
+    boxes = np.column_stack([np.arange(count) * 20, rng.integers(100, 140, count), widths, heights])
+    types = rng.integers(0, 2, count)
+    if not wicks:
+        return CandleSet.from_boxes(boxes, widths * heights, types)
+    highs = boxes[:, 1] - rng.integers(0, 30, count)
+    lows = boxes[:, 1] + heights - 1 + rng.integers(0, 30, count)
+    # Mix measured and unmeasured candles within one series
+    unmeasured = rng.random(count) < 0.2
+    highs[unmeasured] = lows[unmeasured] = -1
+    return CandleSet.from_boxes(boxes, widths * heights, types, highs, lows)
+
+
+def scalar_row(ai, window):
+    prediction = ai.generate_prediction(window, None)
+    return (SIGNAL_NAMES.index(prediction['signal']), prediction['confidence'],
+            prediction['signal_strength'], PATTERN_NAMES.index(prediction['pattern']),
+            MOMENTUM_NAMES.index(prediction['momentum']), TREND_NAMES.index(prediction['trend']),
+            LEVEL_NAMES.index(prediction['support_resistance']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candles', type=int, default=5000, help='candles per random series')
+    parser.add_argument('--work-height', type=int, default=720)
+    args = parser.parse_args()
+
+    ai = GhostCoreAI(cache_size=0, work_height=args.work_height)
+    mismatches = 0
+    print(f"{'window':>6}  {'wicks':>5}  {'windows':>8}  {'scalar/s':>10}  {'vector/s':>12}  {'mismatches':>10}")
+    for window in (3, 4, 5, 6):
+        for wicks in (False, True):
+            candles = random_series(args.candles, window * 2 + wicks, wicks)
+            start = time.perf_counter()
+            scores = ai.score_windows(candles, window)
+            vector_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            expected = [scalar_row(ai, candles[i:i + window]) for i in range(len(scores))]
+            scalar_seconds = time.perf_counter() - start
+
+            bad = [i for i, row in enumerate(expected) if row != tuple(scores[i].tolist())]
+            for i in bad[:5]:
+                print(f"  window {i}: scalar {expected[i]} vector {tuple(scores[i].tolist())}")
+            mismatches += len(bad)
+            print(f"{window:>6}  {str(wicks):>5}  {len(scores):>8}  {len(scores) / scalar_seconds:10.0f}"
+                  f"  {len(scores) / vector_seconds:12.0f}  {len(bad):>10}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
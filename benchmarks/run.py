@@ -0,0 +1,200 @@
+"""Benchmark suite for the analysis pipeline on synthetic charts
+
+Measures per-stage latency (detect_candles, generate_prediction,
+create_debug_overlay, overlay encoding, end-to-end analyze_array), /analyze
+throughput through the Flask test client and peak traced memory per image
+size. Results are written as JSON; when a baseline file exists, medians are
+compared against it and regressions beyond --tolerance fail the run.
+
+Usage:
+    python benchmarks/run.py                      # run and compare with the baseline
+    python benchmarks/run.py --save               # run and overwrite the baseline
+    python benchmarks/run.py --sizes 1920x1080 --repeat 20 --output out.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ghostcore
+import main
+from synthetic import match_rate, render_chart
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def timings(func, repeat):
+    """Call func repeat times and summarize wall-clock latency in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 3),
+        'min_ms': round(samples[0], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }
+
+
+def peak_memory(func):
+    """Peak Python/NumPy heap growth while func runs, in MiB"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+
+def bench_size(ai, width, height, args):
+    """All stage measurements for one image size"""
+    # detect_candles drops bodies narrower than its 15 px horizontal kernel, so
+    # small frames get fewer, wider candles by default
+    count = args.candles or min(40, width // 30)
+    image, truth = render_chart(width, height, count, args.theme, args.noise, args.seed)
+    candles = ai.detect_candles(image)
+    prediction = ai.generate_prediction(candles, image)
+    analysis_id = ai.analyze_array(image)['analysis_id']
+
+    results = {
+        'detect_candles': timings(lambda: ai.detect_candles(image), args.repeat),
+        'generate_prediction': timings(lambda: ai.generate_prediction(candles, image), args.repeat),
+        'create_debug_overlay': timings(lambda: ai.create_debug_overlay(image, candles, prediction), args.repeat),
+        'render_debug_image': timings(lambda: ai.render_debug_image(analysis_id), args.repeat),
+        'analyze_array': timings(lambda: ai.analyze_array(image, debug=False), args.repeat),
+        'peak_memory_mib': peak_memory(lambda: ai.analyze_array(image, debug=False)),
+        'candles_detected': len(candles),
+        'match_rate': round(match_rate(list(candles), truth), 3),
+    }
+    results['analyze_route'] = bench_route(image, args.route_requests)
+    return results
+
+
+def bench_route(image, requests):
+    """End-to-end /analyze throughput through the Flask test client"""
+    ok, encoded = cv2.imencode('.png', image)
+    data = encoded.tobytes()
+    client = main.app.test_client()
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.post('/analyze', data={'file': (io.BytesIO(data), 'chart.png')})
+        if 'error' in response.get_json():
+            raise RuntimeError(response.get_json()['error'])
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': requests,
+        'requests_per_s': round(requests / elapsed, 2),
+        'latency_ms': round(elapsed / requests * 1000, 3),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """List of regression messages for medians slower than baseline by more than tolerance"""
+    regressions = []
+    for size, stages in current['results'].items():
+        for stage, value in stages.items():
+            before = baseline.get('results', {}).get(size, {}).get(stage)
+            if isinstance(value, dict) and isinstance(before, dict):
+                if 'median_ms' in value and before.get('median_ms'):
+                    ratio = value['median_ms'] / before['median_ms']
+                    label = f"{size} {stage}: {before['median_ms']:.2f} -> {value['median_ms']:.2f} ms"
+                elif 'requests_per_s' in value and value['requests_per_s']:
+                    ratio = before['requests_per_s'] / value['requests_per_s']
+                    label = f"{size} {stage}: {before['requests_per_s']:.1f} -> {value['requests_per_s']:.1f} req/s"
+                else:
+                    continue
+            elif stage == 'peak_memory_mib' and before:
+                ratio = value / before
+                label = f"{size} {stage}: {before:.1f} -> {value:.1f} MiB"
+            else:
+                continue
+            if ratio > 1 + tolerance:
+                regressions.append(f"{label} ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='GhostCore analysis benchmarks')
+    parser.add_argument('--sizes', nargs='*', default=['640x360', '1280x720', '1920x1080', '3840x2160'])
+    parser.add_argument('--candles', type=int, help='Candles per chart (default: scaled to the width, max 40)')
+    parser.add_argument('--theme', default='dark', choices=['dark', 'light', 'classic'])
+    parser.add_argument('--noise', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--route-requests', type=int, default=20)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--output', help='Also write this run to a JSON file')
+    parser.add_argument('--save', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown before failing (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # Measure the pipeline itself, not the result caches
+    ai = ghostcore.GhostCoreAI(cache_size=0)
+    main.ghost_ai.result_cache.max_size = 0
+    main.ghost_ai.candle_cache.max_size = 0
+
+    # One-off per-process costs (colour lookup table) are not part of any stage
+    ghostcore.color_lut()
+
+    run = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {k: v for k, v in vars(args).items() if k not in ('baseline', 'output', 'save')},
+        },
+        'results': {},
+    }
+    for size in args.sizes:
+        width, height = (int(v) for v in size.lower().split('x'))
+        run['results'][size] = stages = bench_size(ai, width, height, args)
+        print(f"{size:>10}  detect {stages['detect_candles']['median_ms']:8.2f} ms  "
+              f"analyze {stages['analyze_array']['median_ms']:8.2f} ms  "
+              f"overlay+encode {stages['render_debug_image']['median_ms']:8.2f} ms  "
+              f"route {stages['analyze_route']['requests_per_s']:7.1f} req/s  "
+              f"peak {stages['peak_memory_mib']:7.1f} MiB  match {stages['match_rate']:.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    status = 0
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(run, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
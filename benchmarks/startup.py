@@ -0,0 +1,96 @@
+"""Import-time and first-request latency report
+
+Each run starts a fresh interpreter that imports main, optionally calls
+create_app() with warm-up, then times the first /analyze request and a
+second one with a different chart through the Flask test client. Medians
+over the runs are printed along with the heavy modules that were already
+loaded after the import.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --repo /path/to/other/checkout
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import render_chart
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import io, json, sys, time
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+loaded = [name for name in ('cv2', 'numpy', 'PIL', 'imutils', 'pytz', 'multiprocessing.shared_memory')
+          if name in sys.modules]
+
+warm_up_ms = None
+if WARM_UP and hasattr(main, 'create_app'):
+    start = time.perf_counter()
+    main.create_app(warm_up=True)
+    warm_up_ms = (time.perf_counter() - start) * 1000
+
+client = main.app.test_client()
+requests_ms = []
+for image in IMAGES:
+    data = open(image, 'rb').read()
+    start = time.perf_counter()
+    response = client.post('/analyze', data={'file': (io.BytesIO(data), 'chart.png')})
+    requests_ms.append((time.perf_counter() - start) * 1000)
+    assert response.status_code == 200, response.status_code
+print(json.dumps({"import_ms": import_ms, "loaded_at_import": loaded, "warm_up_ms": warm_up_ms,
+                  "first_request_ms": requests_ms[0], "second_request_ms": requests_ms[1]}))
+'''
+
+
+def run_child(repo, images, warm_up, workdir):
+    code = CHILD.replace('WARM_UP', repr(warm_up)).replace('IMAGES', repr(images))
+    env = dict(os.environ, PYTHONPATH=repo, PYTHONDONTWRITEBYTECODE='')
+    output = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(samples, key):
+    values = [sample[key] for sample in samples if sample[key] is not None]
+    return round(statistics.median(values), 1) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--repo', default=REPO, help='checkout whose main.py is measured')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        images = [os.path.join(workdir, f'chart{seed}.png') for seed in (0, 1)]
+        for seed, path in enumerate(images):
+            cv2.imwrite(path, render_chart(seed=seed)[0])
+        # Populate __pycache__ so the runs measure imports, not compilation
+        run_child(args.repo, images, False, workdir)
+
+        report = {}
+        for warm_up in (False, True):
+            samples = [run_child(args.repo, images, warm_up, workdir) for _ in range(args.runs)]
+            report['warm_up' if warm_up else 'cold'] = {
+                "import_ms": median(samples, 'import_ms'),
+                "warm_up_ms": median(samples, 'warm_up_ms'),
+                "first_request_ms": median(samples, 'first_request_ms'),
+                "second_request_ms": median(samples, 'second_request_ms'),
+                "loaded_at_import": samples[0]['loaded_at_import'],
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Deterministic synthetic candlestick chart renderer for benchmarks
+
+render_chart() draws candles with known geometry so timings are reproducible
+and detection results can be checked against the ground truth it returns.
+render_panels() tiles several charts into one multi-chart screenshot.
+"""
+import cv2
+import numpy as np
+
+# BGR colours; candle colours sit inside the HSV ranges detect_candles accepts
+THEMES = {
+    'dark': {
+        'background': (30, 24, 20), 'grid': (58, 52, 46), 'text': (150, 150, 150), 'divider': (72, 66, 60),
+        'bullish': (90, 200, 40), 'bearish': (60, 50, 230),
+    },
+    'light': {
+        'background': (250, 250, 250), 'grid': (225, 225, 225), 'text': (90, 90, 90), 'divider': (190, 190, 190),
+        'bullish': (80, 175, 38), 'bearish': (70, 60, 235),
+    },
+    'classic': {
+        'background': (0, 0, 0), 'grid': (40, 40, 40), 'text': (200, 200, 200), 'divider': (90, 90, 90),
+        'bullish': (0, 255, 0), 'bearish': (0, 0, 255),
+    },
+}
+
+
+def render_chart(width=1280, height=720, candles=40, theme='dark', noise=0.0, seed=0, chrome=False):
+    """Render a chart screenshot and return (image, truth)
+
+    truth lists every candle left to right as a dict with its type, body box
+    (x, y, width, height) and wick extents (wick_top, wick_bottom). noise is
+    the standard deviation of Gaussian pixel noise in grey levels. chrome adds
+    a toolbar and an order panel around the plot, like a broker screenshot.
+    """
+    colors = THEMES[theme]
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = colors['background']
+
+    # Plot area, optionally surrounded by UI chrome
+    left, top, right, bottom = 0, 0, width, height
+    if chrome:
+        top = max(height // 14, 20)
+        right = width - max(width // 6, 60)
+        image[:top] = (44, 40, 36)
+        image[:, right:] = (44, 40, 36)
+        cv2.rectangle(image, (right + 10, top + 20), (width - 10, top + 60), colors['bullish'], -1)
+        cv2.rectangle(image, (right + 10, top + 80), (width - 10, top + 120), colors['bearish'], -1)
+        for i in range(8):
+            cv2.putText(image, f"{1.08 + i * 0.0005:.4f}", (right + 10, top + 160 + i * 24),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, colors['text'], 1)
+
+    plot_height = bottom - top
+    for y in range(top, bottom, max(plot_height // 10, 8)):
+        cv2.line(image, (left, y), (right, y), colors['grid'], 1)
+
+    step = (right - left) / (candles + 2)
+    body_width = max(int(step * 0.6), 3)
+    margin = plot_height * 0.1
+    price = top + plot_height / 2
+    truth = []
+    for i in range(candles):
+        close = float(np.clip(price + rng.normal(0, plot_height / 25), top + margin, bottom - margin))
+        body_top, body_bottom = sorted((int(round(price)), int(round(close))))
+        body_bottom = max(body_bottom, body_top + max(body_width * 2, 10))
+        wick_top = max(int(body_top - rng.uniform(2, plot_height / 15)), top + 1)
+        wick_bottom = min(int(body_bottom + rng.uniform(2, plot_height / 15)), bottom - 2)
+        kind = 'bullish' if close < price else 'bearish'
+
+        x = left + int((i + 1) * step)
+        center = x + body_width // 2
+        cv2.line(image, (center, wick_top), (center, wick_bottom), colors[kind], 1)
+        cv2.rectangle(image, (x, body_top), (x + body_width - 1, body_bottom - 1), colors[kind], -1)
+        truth.append({
+            'type': kind, 'x': x, 'y': body_top,
+            'width': body_width, 'height': body_bottom - body_top,
+            'wick_top': wick_top, 'wick_bottom': wick_bottom,
+        })
+        price = close
+
+    if noise > 0:
+        noisy = image.astype(np.float32) + rng.normal(0, noise, image.shape).astype(np.float32)
+        image = np.clip(noisy, 0, 255).astype(np.uint8)
+    return image, truth
+
+
+def render_panels(rows=2, cols=2, width=1920, height=1080, divider=3, candles=20, theme='dark', seed=0,
+                  chrome=False):
+    """Render rows x cols charts separated by divider lines; return (image, panels)
+
+    panels lists ((x, y, width, height), truth) per chart in row-major order,
+    with truth in full-image coordinates.
+    """
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = THEMES[theme]['divider']
+    xs = np.linspace(0, width + divider, cols + 1).astype(int)
+    ys = np.linspace(0, height + divider, rows + 1).astype(int)
+    panels = []
+    for row in range(rows):
+        for col in range(cols):
+            x, y = int(xs[col]), int(ys[row])
+            w, h = int(xs[col + 1]) - x - divider, int(ys[row + 1]) - y - divider
+            chart, truth = render_chart(width=w, height=h, candles=candles, theme=theme,
+                                        seed=seed * 16 + row * cols + col, chrome=chrome)
+            image[y:y + h, x:x + w] = chart
+            for candle in truth:
+                candle.update(x=candle['x'] + x, y=candle['y'] + y,
+                              wick_top=candle['wick_top'] + y, wick_bottom=candle['wick_bottom'] + y)
+            panels.append(((x, y, w, h), truth))
+    return image, panels
+
+
+def match_rate(detected, truth, tolerance=3):
+    """Fraction of detected candles whose body box matches a true candle"""
+    if not detected:
+        return 0.0
+    matched = 0
+    for candle in detected:
+        for true in truth:
+            if (candle['type'] == true['type'] and
+                    abs(candle['x'] - true['x']) <= tolerance and
+                    abs(candle['y'] - true['y']) <= tolerance and
+                    abs(candle['height'] - true['height']) <= tolerance * 2):
+                matched += 1
+                break
+    return matched / len(detected)
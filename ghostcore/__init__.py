@@ -0,0 +1,26 @@
+"""GhostCore chart analysis engine
+
+Importable without Flask or any global configuration: build a GhostCoreAI
+with the settings you need and call analyze_bytes / analyze_array on it.
+OpenCV and NumPy are only imported by the first analysis. Run
+``python -m ghostcore`` for the command-line interface.
+"""
+from .buffers import BufferPool
+from .cache import NearDuplicateCache, ResultCache, content_hash, perceptual_hash
+from .candles import ALLOWED_EXTENSIONS, BEARISH, BULLISH, CANDLE_FIELDS, CANDLE_TYPES, CandleSet, decode_image
+from .colors import classify_colors, color_lut, hsv_color_masks
+from .engine import DEBUG_IMAGE_FORMATS, WINDOW_SCORE_FIELDS, GhostCoreAI, StreamSession, bangladesh_now
+from .history import HistoryStore
+from .metrics import PipelineMetrics
+from .profiling import ProfileStore
+from .region import ChartRegionDetector
+from .scheduler import DeadlineExceeded, DeadlineScheduler, QueueFullError
+from .triage import ChartTriage
+
+__all__ = [
+    'ALLOWED_EXTENSIONS', 'BEARISH', 'BULLISH', 'BufferPool', 'CANDLE_FIELDS', 'CANDLE_TYPES', 'CandleSet',
+    'ChartRegionDetector', 'ChartTriage', 'DEBUG_IMAGE_FORMATS', 'DeadlineExceeded', 'DeadlineScheduler',
+    'GhostCoreAI', 'HistoryStore', 'NearDuplicateCache', 'PipelineMetrics', 'ProfileStore',
+    'QueueFullError', 'ResultCache', 'StreamSession', 'WINDOW_SCORE_FIELDS', 'bangladesh_now',
+    'classify_colors', 'color_lut', 'content_hash', 'decode_image', 'hsv_color_masks', 'perceptual_hash',
+]
@@ -0,0 +1,73 @@
+"""Per-thread scratch arrays reused across frames of the same shape"""
+import threading
+from collections import OrderedDict
+
+from .lazy import LazyModule
+
+np = LazyModule('numpy', 'np', globals())
+
+class BufferPool:
+    """Scratch arrays for the detection pipeline, owned by the calling thread
+    
+    Buffers are grouped by frame size (height, width) and the most recently
+    used max_shapes sizes are kept per thread, so a worker's memory stays
+    constant while frame sizes repeat. A buffer's contents are undefined when
+    handed out and it is only valid until the same thread asks for it again.
+    """
+    
+    def __init__(self, max_shapes=4):
+        self.max_shapes = max_shapes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+        self.evictions = 0
+        self.allocated_bytes = 0
+    
+    def get(self, name, shape, dtype='uint8', frame=None):
+        """Scratch array called name for a frame of size frame (default shape[:2])"""
+        if self.max_shapes <= 0:
+            buffer = np.empty(shape, dtype=dtype)
+            with self._lock:
+                self.allocations += 1
+                self.allocated_bytes += buffer.nbytes
+            return buffer
+        
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = OrderedDict()
+        size = tuple(frame or shape[:2])
+        buffers = frames.get(size)
+        if buffers is None:
+            buffers = frames[size] = {}
+            if len(frames) > self.max_shapes:
+                frames.popitem(last=False)
+                with self._lock:
+                    self.evictions += 1
+        else:
+            frames.move_to_end(size)
+        
+        key = (name, tuple(shape), dtype)
+        buffer = buffers.get(key)
+        with self._lock:
+            if buffer is None:
+                buffer = buffers[key] = np.empty(shape, dtype=dtype)
+                self.allocations += 1
+                self.allocated_bytes += buffer.nbytes
+            else:
+                self.reuses += 1
+        return buffer
+    
+    def clear(self):
+        """Drop this thread's buffers"""
+        self._local.frames = OrderedDict()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "max_shapes": self.max_shapes,
+                "allocations": self.allocations,
+                "reuses": self.reuses,
+                "evictions": self.evictions,
+                "allocated_bytes": self.allocated_bytes,
+            }
@@ -0,0 +1,150 @@
+"""Result caches and the keys they are looked up by"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from .lazy import LazyModule
+
+cv2 = LazyModule('cv2', 'cv2', globals())
+np = LazyModule('numpy', 'np', globals())
+
+class ResultCache:
+    """Thread-safe LRU cache with an optional time-to-live and hit/miss counters
+    
+    Besides the entry count, the cache can be bounded by max_bytes, the sum
+    of sizeof(value) over all entries; a value larger than that on its own
+    is not kept.
+    """
+    
+    def __init__(self, max_size=256, ttl=None, max_bytes=None, sizeof=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key, default=None):
+        """Return the cached value for key, refreshing its LRU position"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                value, stored_at, size = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+                self.bytes -= size
+                self.expirations += 1
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        if self.max_size <= 0:
+            return
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._items[key] = (value, time.monotonic(), size)
+            self.bytes += size
+            while len(self._items) > self.max_size or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes):
+                self.bytes -= self._items.popitem(last=False)[1][2]
+                self.evictions += 1
+    
+    def pop(self, key, default=None):
+        """Remove key and return its value"""
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None:
+                return default
+            self.bytes -= entry[2]
+            return entry[0]
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def stats(self):
+        """Counters and occupancy for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class NearDuplicateCache(ResultCache):
+    """ResultCache over perceptual_hash keys that also matches keys a few bits off
+    
+    A lookup without an exact match takes the entry for the same frame size
+    whose hash differs in the fewest bits, up to max_distance. Lookups scan
+    the entries, which stays cheap at cache sizes of a few hundred.
+    """
+    
+    def __init__(self, max_size=256, ttl=None, max_distance=64):
+        super().__init__(max_size, ttl)
+        self.max_distance = max_distance
+    
+    def get(self, key, default=None):
+        with self._lock:
+            match = key if key in self._items else self._nearest(key)
+            if match is None:
+                self.misses += 1
+                return default
+        return super().get(match, default)
+    
+    def _nearest(self, key):
+        bits = int.from_bytes(key[2], 'little')
+        best, best_distance = None, self.max_distance + 1
+        for other in self._items:
+            if other[:2] != key[:2]:
+                continue
+            distance = bin(int.from_bytes(other[2], 'little') ^ bits).count('1')
+            if distance < best_distance:
+                best, best_distance = other, distance
+        return best
+
+def content_hash(buf):
+    """Exact cache key for an encoded upload"""
+    return hashlib.blake2b(buf, digest_size=16).digest()
+
+def perceptual_hash(image, size=32, dead_zone=4):
+    """Near-duplicate cache key: gradient-sign bits of a downscaled frame
+    
+    Each colour channel is shrunk to size x (size + 1) and compared with its
+    right neighbour, giving one bit for "clearly brighter" and one for
+    "clearly darker" per cell. Differences within dead_zone grey levels set
+    neither, so flat background does not flip with compression noise. Noise
+    still flips a few bits near the dead zone edges, so keys are matched by
+    Hamming distance (NearDuplicateCache) rather than exactly, and a
+    candle growing by a few pixels can hash alike, so hits must be checked
+    against the frame (GhostCoreAI.candles_match). The frame size is part of
+    the key because cached candle geometry is in pixel coordinates.
+    """
+    small = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    diff = small[:, 1:] - small[:, :-1]
+    bits = np.packbits(np.concatenate([(diff > dead_zone).ravel(), (diff < -dead_zone).ravel()]))
+    return image.shape[:2] + (bits.tobytes(),)
@@ -0,0 +1,116 @@
+"""Candle records: the structured array every stage passes around"""
+from .lazy import LazyModule
+
+cv2 = LazyModule('cv2', 'cv2', globals())
+np = LazyModule('numpy', 'np', globals())
+
+ALLOWED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+# Candle type codes stored in CandleSet['type']
+BEARISH = 0
+BULLISH = 1
+CANDLE_TYPES = ('bearish', 'bullish')
+
+# Structured dtype field lists; NumPy turns them into dtypes on use
+CANDLE_FIELDS = [
+    ('x', '<i4'), ('y', '<i4'), ('width', '<i4'), ('height', '<i4'),
+    ('center_x', '<i4'), ('area', '<f8'), ('type', 'i1'),
+    ('body_ratio', '<f8'), ('aspect_ratio', '<f8'),
+    # Wick tips (topmost and bottom-most coloured row), -1 when the extractor
+    # does not measure wicks
+    ('high', '<i4'), ('low', '<i4'),
+]
+
+class CandleSet:
+    """Detected candles stored as one NumPy structured array
+    
+    Indexing with a field name returns that column, slices and masks return
+    a new CandleSet and an integer returns the candle as a dict.
+    """
+    __slots__ = ('data',)
+    
+    def __init__(self, data=None):
+        self.data = np.zeros(0, dtype=CANDLE_FIELDS) if data is None else data
+    
+    @classmethod
+    def from_boxes(cls, boxes, areas, types, highs=None, lows=None):
+        """Build a set from (x, y, w, h) body boxes, areas, type codes and optional wick tips"""
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        x, y, w, h = boxes.T
+        data = np.zeros(len(boxes), dtype=CANDLE_FIELDS)
+        data['x'] = x
+        data['y'] = y
+        data['width'] = w
+        data['height'] = h
+        data['center_x'] = x + w // 2
+        data['area'] = areas
+        data['type'] = types
+        data['high'] = -1 if highs is None else highs
+        data['low'] = -1 if lows is None else lows
+        with np.errstate(divide='ignore', invalid='ignore'):
+            data['body_ratio'] = np.where(h > 0, w / h, 0)
+            data['aspect_ratio'] = np.where(w > 0, h / w, 0)
+        return cls(data)
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            return self.to_dicts(self.data[key:key + 1 or None])[0]
+        return CandleSet(self.data[key])
+    
+    def __iter__(self):
+        return iter(self.to_dicts())
+    
+    def shifted(self, dx, dy=0):
+        """Return a copy with every box moved by (dx, dy) pixels"""
+        data = self.data.copy()
+        data['x'] += dx
+        data['y'] += dy
+        data['center_x'] += dx
+        if dy:
+            wicks = data['high'] >= 0
+            data['high'][wicks] += dy
+            data['low'][wicks] += dy
+        return CandleSet(data)
+    
+    def scaled(self, factor):
+        """Return a copy with geometry multiplied by factor, e.g. back to original resolution"""
+        data = self.data.copy()
+        x = np.rint(self.data['x'] * factor)
+        right = np.rint((self.data['x'] + self.data['width']) * factor)
+        data['x'] = x
+        data['width'] = right - x
+        data['y'] = np.rint(self.data['y'] * factor)
+        data['height'] = np.rint((self.data['y'] + self.data['height']) * factor) - data['y']
+        data['center_x'] = data['x'] + data['width'] // 2
+        data['area'] = self.data['area'] * factor * factor
+        wicks = self.data['high'] >= 0
+        data['high'][wicks] = np.rint(self.data['high'][wicks] * factor)
+        data['low'][wicks] = np.rint(self.data['low'][wicks] * factor)
+        return CandleSet(data)
+    
+    def sorted(self):
+        """Return the candles in time order (left to right)"""
+        order = np.argsort(self.data['center_x'], kind='stable')
+        return CandleSet(self.data[order])
+    
+    def to_dicts(self, data=None):
+        """Export candles as JSON-friendly dicts"""
+        data = self.data if data is None else data
+        names = [name for name, _ in CANDLE_FIELDS if name != 'type']
+        columns = [data[name].tolist() for name in names]
+        types = [CANDLE_TYPES[t] for t in data['type'].tolist()]
+        return [dict(zip(names, row), type=t) for row, t in zip(zip(*columns), types)]
+
+def decode_image(buf):
+    """Decode an encoded image buffer to a BGR array, or None if it is unreadable"""
+    try:
+        # Wrap the buffer without copying and decode it directly
+        data = np.frombuffer(buf, dtype=np.uint8)
+        return cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    except Exception:
+        return None
@@ -0,0 +1,154 @@
+"""Command-line interface: analyze chart screenshots and stream JSONL results
+
+Inputs are file paths or glob patterns; with no inputs, or '-', paths are
+read from stdin one per line. Files are analyzed on a process pool and one
+JSON object per input is written in input order as soon as it is ready.
+
+Usage:
+    python -m ghostcore shots/*.png
+    find shots -name '*.png' | python -m ghostcore --workers 4 --no-overlay > results.jsonl
+    python -m ghostcore 'archive/**/*.jpg' --timings --overlay-dir overlays
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .candles import decode_image
+from .engine import DEBUG_IMAGE_FORMATS, GhostCoreAI
+
+_cli_ai = None
+_cli_options = None
+
+def iter_inputs(patterns, stdin=sys.stdin):
+    """Expand file paths and globs in order; '-' or no patterns reads paths from stdin"""
+    if not patterns:
+        patterns = ['-']
+    for pattern in patterns:
+        if pattern == '-':
+            for line in stdin:
+                path = line.strip()
+                if path:
+                    yield path
+        elif glob.has_magic(pattern):
+            yield from sorted(glob.glob(pattern, recursive=True))
+        else:
+            yield pattern
+
+def _init_worker(options):
+    """Create one analyzer per worker process; caches are off, only the last overlay is kept"""
+    global _cli_ai, _cli_options
+    _cli_options = options
+    _cli_ai = GhostCoreAI(workers=1, cache_size=0, debug_store_size=1,
+                          debug_format=options['overlay_format'],
+                          work_height=options['work_height'], roi_detection=options['roi_detection'],
+                          extractor=options['extractor'], lookback=options['lookback'],
+                          progressive=options['progressive'], triage=options['triage'])
+
+def _analyze_path(index, path):
+    """Worker entry point: analyze one file and optionally write its overlay"""
+    options = _cli_options
+    try:
+        with open(path, 'rb') as f:
+            buf = f.read()
+    except OSError as e:
+        return {"path": path, "error": f"Could not read file: {e.strerror}"}
+
+    with _cli_ai.metrics.collect() as stage_timings:
+        with _cli_ai.metrics.stage('decode'):
+            image = decode_image(buf)
+        if image is None:
+            return {"path": path, "error": "Could not load image"}
+        if options['panels']:
+            # One prediction per chart panel, without overlays
+            prediction = _cli_ai.analyze_panels(image)
+        else:
+            prediction = _cli_ai.analyze_array(image, debug=options['overlay'])
+
+        analysis_id = prediction.pop('analysis_id', None)
+        if analysis_id is not None:
+            rendered = _cli_ai.render_debug_image(analysis_id)
+            if rendered is not None:
+                stem = os.path.splitext(os.path.basename(path))[0]
+                extension = DEBUG_IMAGE_FORMATS[options['overlay_format']][0]
+                # The index keeps overlays of same-named inputs apart
+                overlay_path = os.path.join(options['overlay_dir'], f"{index:06d}-{stem}{extension}")
+                with open(overlay_path, 'wb') as f:
+                    f.write(rendered[0])
+                prediction['overlay'] = overlay_path
+
+    if options['timings']:
+        prediction['timings_ms'] = stage_timings
+    return dict(path=path, **prediction)
+
+def run(paths, out, workers=None, **options):
+    """Analyze every path on a process pool, writing one JSON line each to out
+
+    At most a few files per worker are in flight. Returns (analyzed, failed).
+    """
+    workers = workers or os.cpu_count() or 1
+    if options['overlay']:
+        os.makedirs(options['overlay_dir'], exist_ok=True)
+    analyzed = failed = 0
+    pending = deque()
+
+    def emit(path, future):
+        nonlocal analyzed, failed
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"path": path, "error": f"Analysis failed: {str(e)}"}
+        analyzed += 1
+        failed += "error" in result
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(options,)) as pool:
+        for index, path in enumerate(paths):
+            pending.append((path, pool.submit(_analyze_path, index, path)))
+            if len(pending) >= workers * 4:
+                emit(*pending.popleft())
+        for path, future in pending:
+            emit(path, future)
+    return analyzed, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ghostcore', description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='*', help="image files or globs; '-' or none reads paths from stdin")
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--output', default='-', help='JSONL output path (default: stdout)')
+    parser.add_argument('--no-overlay', action='store_true', help='skip rendering debug overlays')
+    parser.add_argument('--overlay-dir', default='overlays', help='where overlays are written (default: overlays)')
+    parser.add_argument('--overlay-format', default='png', choices=sorted(DEBUG_IMAGE_FORMATS))
+    parser.add_argument('--timings', action='store_true', help='include per-stage latencies (ms)')
+    parser.add_argument('--work-height', type=int, default=720, help='analysis height, 0 disables downscaling')
+    parser.add_argument('--no-roi', action='store_true', help='disable chart-area detection')
+    parser.add_argument('--extractor', default='contours', choices=GhostCoreAI.EXTRACTORS,
+                        help='candle extractor (profile also measures wicks)')
+    parser.add_argument('--progressive', action='store_true',
+                        help='scan from the right edge and stop once the lookback is filled')
+    parser.add_argument('--panels', action='store_true',
+                        help='split multi-chart screenshots and score every panel (no overlays)')
+    parser.add_argument('--lookback', type=int, default=8,
+                        help='candles kept per chart, 0 keeps all (deep trend and levels past 8)')
+    parser.add_argument('--triage', action='store_true',
+                        help='reject images that do not look like candlestick charts before detection')
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        analyzed, failed = run(iter_inputs(args.inputs), out, workers=args.workers,
+                               overlay=not args.no_overlay, overlay_dir=args.overlay_dir,
+                               overlay_format=args.overlay_format, timings=args.timings,
+                               work_height=args.work_height or None, roi_detection=not args.no_roi,
+                               extractor=args.extractor, lookback=args.lookback or None,
+                               panels=args.panels, progressive=args.progressive, triage=args.triage)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{analyzed} analyzed, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
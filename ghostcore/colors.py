@@ -0,0 +1,65 @@
+"""Green/red candle colour classification"""
+from .lazy import LazyModule
+
+cv2 = LazyModule('cv2', 'cv2', globals())
+np = LazyModule('numpy', 'np', globals())
+
+# Colour ranges for green and red candles, applied after boosting
+# saturation and value of the HSV image
+GREEN_RANGE = ((45, 80, 80), (75, 255, 255))
+RED_RANGES = (((0, 80, 80), (8, 255, 255)), ((172, 80, 80), (180, 255, 255)))
+SATURATION_BOOST = 1.2
+VALUE_BOOST = 1.1
+
+def hsv_color_masks(bgr):
+    """Reference classifier: green and red candle masks via HSV thresholds"""
+    # Convert to HSV for better color detection
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    
+    # Enhance saturation and value channels
+    hsv[:,:,1] = cv2.multiply(hsv[:,:,1], SATURATION_BOOST)
+    hsv[:,:,2] = cv2.multiply(hsv[:,:,2], VALUE_BOOST)
+    
+    green_mask = cv2.inRange(hsv, np.array(GREEN_RANGE[0]), np.array(GREEN_RANGE[1]))
+    red_mask = cv2.inRange(hsv, np.array(RED_RANGES[0][0]), np.array(RED_RANGES[0][1]))
+    for lower, upper in RED_RANGES[1:]:
+        red_mask = cv2.bitwise_or(red_mask, cv2.inRange(hsv, np.array(lower), np.array(upper)))
+    return green_mask, red_mask
+
+_color_lut = None
+
+def color_lut():
+    """Lookup table mapping every 24-bit BGR colour to its packed green/red mask bytes
+    
+    Entry r << 16 | g << 8 | b holds the uint16 whose low byte is the green
+    mask value and high byte the red mask value for that colour. The table is
+    derived from hsv_color_masks, one red plane at a time, so both paths agree
+    exactly. It costs 32 MB and is built once per process.
+    """
+    global _color_lut
+    if _color_lut is None:
+        lut = np.empty((256, 256, 256), dtype=np.uint16)
+        # Plane for a fixed red value: row is green, column is blue
+        plane = np.empty((256, 256, 3), dtype=np.uint8)
+        plane[:, :, 0] = np.arange(256, dtype=np.uint8)[None, :]
+        plane[:, :, 1] = np.arange(256, dtype=np.uint8)[:, None]
+        for r in range(256):
+            plane[:, :, 2] = r
+            green_mask, red_mask = hsv_color_masks(plane)
+            lut[r] = green_mask.astype(np.uint16) | (red_mask.astype(np.uint16) << 8)
+        _color_lut = lut.reshape(-1)
+    return _color_lut
+
+def classify_colors(bgr, bgra=None, packed=None):
+    """Green and red candle masks for a BGR image as one 2-channel uint8 image
+    
+    bgra (height, width, 4) uint8 and packed (height, width) uint16 are
+    optional preallocated buffers; the result is a view of packed.
+    """
+    lut = color_lut()
+    # Pad to BGRA so each pixel reads as one little-endian uint32 index
+    index = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA, dst=bgra).view(np.uint32)[:, :, 0]
+    np.bitwise_and(index, 0x00FFFFFF, out=index)
+    # Indices never exceed the table, and 'clip' lets take write straight into out
+    packed = np.take(lut, index, out=packed, mode='clip')
+    return packed.view(np.uint8).reshape(bgr.shape[0], bgr.shape[1], 2)
@@ -0,0 +1,1670 @@
+"""The analysis engine: detection, scoring, overlays, batches and live streams"""
+import copy
+import cProfile
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from .buffers import BufferPool
+from .cache import NearDuplicateCache, ResultCache, content_hash, perceptual_hash
+from .candles import BEARISH, BULLISH, CandleSet, decode_image
+from .colors import classify_colors, color_lut
+from .history import LEVEL_NAMES, MOMENTUM_NAMES, PATTERN_NAMES, SIGNAL_NAMES, TREND_NAMES, HistoryStore
+from .lazy import LazyModule
+from .metrics import PipelineMetrics
+from .profiling import ProfileStore
+from .region import ChartRegionDetector
+from .triage import ChartTriage
+
+cv2 = LazyModule('cv2', 'cv2', globals())
+np = LazyModule('numpy', 'np', globals())
+shared_memory = LazyModule('multiprocessing.shared_memory', 'shared_memory', globals())
+
+DEBUG_IMAGE_FORMATS = {
+    'png': ('.png', 'image/png'),
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'jpg': ('.jpg', 'image/jpeg'),
+    'webp': ('.webp', 'image/webp'),
+}
+
+# One row per scored window from GhostCoreAI.score_windows; the code columns
+# index the history code tables
+WINDOW_SCORE_FIELDS = [
+    ('signal', 'u1'), ('confidence', '<f8'), ('signal_strength', '<f8'),
+    ('pattern', 'u1'), ('momentum', 'u1'), ('trend', 'u1'), ('support_resistance', 'u1'),
+]
+
+_dhaka_tz = None
+
+def bangladesh_now():
+    """Current time in Asia/Dhaka; pytz is imported on first call, local time is used without it"""
+    global _dhaka_tz
+    if _dhaka_tz is None:
+        try:
+            import pytz
+            _dhaka_tz = pytz.timezone('Asia/Dhaka')
+        except ImportError:
+            _dhaka_tz = False
+    return datetime.now(_dhaka_tz) if _dhaka_tz else datetime.now()
+
+def _overlay_size(record):
+    """Bytes an overlay record keeps alive: its source image and candle geometry"""
+    source = record['source']
+    size = source.nbytes if isinstance(source, np.ndarray) else len(source or b'')
+    return size + record['candles'].data.nbytes
+
+# Per-process analyzer used by the batch worker pool
+_batch_ai = None
+
+def _init_batch_worker(options):
+    """Create the analyzer once per worker process, configured like the parent's"""
+    global _batch_ai
+    _batch_ai = GhostCoreAI(workers=1, **options)
+
+def _analyze_shared_frame(shm_name, offset, shape):
+    """Worker entry point: analyze a frame published in shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        try:
+            return _batch_ai.analyze_array(image, debug=False)
+        finally:
+            # The view must be released before the mapping can be closed
+            del image
+    finally:
+        shm.close()
+
+class GhostCoreAI:
+    # Frame height the pixel thresholds in detection and scoring were tuned for
+    REFERENCE_HEIGHT = 720
+    EXTRACTORS = ('contours', 'profile')
+    # Windows scored per vectorized pass in score_windows, bounding scratch memory
+    SCORE_CHUNK = 65536
+    # Progressive detection: first window at the right edge, and the distance
+    # from its left cut inside which candles may be clipped (reference pixels)
+    PROGRESSIVE_WINDOW = 384
+    PROGRESSIVE_MARGIN = 16
+    
+    def __init__(self, workers=None, cache_size=256, cache_ttl=60, cache_hash_size=32,
+                 debug_store_size=64, debug_format='png', debug_quality=90, debug_max_size=None,
+                 stream_max_sessions=32, stream_session_ttl=300,
+                 roi_detection=True, roi_cache_size=64, work_height=720, history_dir=None,
+                 buffer_shapes=4, extractor='contours', lookback=8, panel_workers=None, progressive=False,
+                 triage=False, triage_min_color=0.002, triage_max_color=0.35, triage_min_bars=3,
+                 profile_dir=None, profile_max=32, metrics=None, debug_store_bytes=256 * 1024 * 1024,
+                 batch_max_files=64, batch_max_decoded_bytes=512 * 1024 * 1024):
+        self.name = "GHOST CORE AI v.UM.100"
+        self.version = "Multiversal Precision Prediction Bot"
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        # Per analyze_many call: images accepted, and decoded pixel bytes held in shared memory
+        self.batch_max_files = batch_max_files
+        self.batch_max_decoded_bytes = batch_max_decoded_bytes
+        # Batch worker processes analyze with the same settings (overlays are never kept there)
+        self._worker_options = dict(
+            cache_size=cache_size, cache_ttl=cache_ttl, cache_hash_size=cache_hash_size, debug_store_size=0,
+            roi_detection=roi_detection, roi_cache_size=roi_cache_size, work_height=work_height,
+            history_dir=history_dir, buffer_shapes=buffer_shapes, extractor=extractor, lookback=lookback,
+            progressive=progressive, triage=triage, triage_min_color=triage_min_color,
+            triage_max_color=triage_max_color, triage_min_bars=triage_min_bars,
+        )
+        
+        # Threads analyzing the panels of a multi-chart screenshot (at most 4 panels)
+        self.panel_workers = panel_workers or min(self.workers, 4)
+        self._panel_pool = None
+        self._panel_lock = threading.Lock()
+        
+        # Taller frames are downscaled to this height before detection and every
+        # pixel threshold is scaled by work_height / REFERENCE_HEIGHT
+        self.work_height = work_height
+        self.pixel_scale = work_height / self.REFERENCE_HEIGHT if work_height else 1.0
+        
+        # Stage latency histograms and counters for /metrics, possibly shared with other analyzers
+        self.metrics = metrics or PipelineMetrics()
+        
+        # Tier 1: upload content hash -> prediction
+        self.result_cache = ResultCache(cache_size, cache_ttl)
+        # Tier 2: perceptual hash of the frame -> detected candles, matched within a
+        # few hash bits and used only while the candles still match the frame (see candles_match)
+        self.candle_cache = NearDuplicateCache(cache_size, cache_ttl)
+        self.stale_candle_hits = 0
+        self.cache_hash_size = cache_hash_size
+        
+        # Analysis id -> candle geometry and source image, rendered on request. Sources
+        # are uploads or caller arrays, so the store is bounded by their bytes too
+        self.debug_store = ResultCache(debug_store_size, max_bytes=debug_store_bytes, sizeof=_overlay_size)
+        self.debug_format = debug_format.lower()
+        self.debug_quality = debug_quality
+        self.debug_max_size = debug_max_size
+        self.last_analysis_id = None
+        
+        # Append-only log of predictions for later queries
+        self.history = HistoryStore(history_dir) if history_dir else None
+        
+        # Ring buffer of profiled analyses; one profiler runs at a time
+        self.profiles = ProfileStore(profile_dir, profile_max) if profile_dir else None
+        self._profile_lock = threading.Lock()
+        
+        # Candle extraction: 'contours' (bodies only) or 'profile' (bodies and wicks)
+        if extractor not in self.EXTRACTORS:
+            raise ValueError(f"Unknown candle extractor: {extractor}")
+        self.extractor = extractor
+        
+        # Most recent candles kept per frame; None keeps every detected candle.
+        # Beyond the last 8, trend and support/resistance span the whole lookback
+        self.lookback = lookback
+        # Scan from the right edge leftward and stop once lookback candles are found
+        self.progressive = progressive
+        
+        # Per-thread scratch arrays for the pipeline, reused while frame sizes repeat
+        self.buffers = BufferPool(buffer_shapes)
+        self._kernels = None
+        
+        # Chart plotting-area detection, cached per screen layout
+        self.region_detector = ChartRegionDetector(roi_cache_size) if roi_detection else None
+        # Multi-chart layouts are split with the same detector (and its layout cache)
+        self.panel_detector = self.region_detector or ChartRegionDetector(roi_cache_size)
+        
+        # Uploads that cannot be charts are rejected before detection
+        self.triage = ChartTriage(triage_min_color, triage_max_color, triage_min_bars) if triage else None
+        
+        # Live-frame sessions
+        self.streams = ResultCache(stream_max_sessions, stream_session_ttl)
+        if self.debug_format not in DEBUG_IMAGE_FORMATS:
+            raise ValueError(f"Unsupported debug image format: {debug_format}")
+        
+    def analyze_chart(self, image_path):
+        """Main analysis function for chart screenshot"""
+        try:
+            with open(image_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return {"error": "Could not load image"}
+        return self.analyze_bytes(data)
+    
+    def analyze_bytes(self, buf, debug=True, timings=False):
+        """Analyze an encoded image held in memory (bytes, bytearray or memoryview)
+        
+        With timings=True the result includes per-stage latencies in timings_ms.
+        """
+        if timings:
+            with self.metrics.collect() as stage_timings:
+                prediction = self.analyze_bytes(buf, debug)
+            prediction['timings_ms'] = stage_timings
+            return prediction
+        
+        key = cached = None
+        if self.result_cache.max_size > 0:
+            with self.metrics.stage('cache_lookup'):
+                key = content_hash(buf)
+                cached = self.result_cache.get(key)
+        # The overlay is re-rendered from the compressed upload, never from a frame copy
+        source = bytes(buf) if debug else None
+        if cached is not None:
+            prediction, candles = cached
+            prediction = copy.deepcopy(prediction)
+            self._record_history(prediction, candles, None)
+            if debug:
+                prediction['analysis_id'] = self._remember_overlay(candles, prediction, source)
+            return prediction
+        
+        with self.metrics.stage('decode'):
+            image = decode_image(buf)
+        if image is None:
+            self.metrics.error('decode')
+            return {"error": "Could not load image"}
+        
+        prediction, candles = self._analyze(image, debug, source)
+        if key is not None and "error" not in prediction:
+            cached = {k: v for k, v in prediction.items() if k not in ('analysis_id', 'record_id')}
+            self.result_cache.put(key, (copy.deepcopy(cached), candles))
+        return prediction
+    
+    def analyze_bytes_profiled(self, buf, debug=True, timings=False):
+        """analyze_bytes under cProfile, storing the capture in the profile store
+        
+        Both caches are bypassed so the whole pipeline is profiled. The
+        prediction carries the capture's profile_id. Without a profile store,
+        or while another analysis is being profiled, this is analyze_bytes.
+        """
+        if self.profiles is None or not self._profile_lock.acquire(blocking=False):
+            return self.analyze_bytes(buf, debug, timings)
+        try:
+            profiler = cProfile.Profile()
+            with self.metrics.collect() as stage_timings, self.metrics.record_detections() as detections:
+                start = time.perf_counter()
+                profiler.enable()
+                try:
+                    with self.metrics.stage('decode'):
+                        image = decode_image(buf)
+                    prediction = self._analyze(image, debug, bytes(buf) if debug else None, use_cache=False)[0]
+                finally:
+                    profiler.disable()
+                elapsed = time.perf_counter() - start
+        finally:
+            self._profile_lock.release()
+        
+        try:
+            prediction['profile_id'] = self.profiles.save(profiler, {
+                "captured_at": time.time(),
+                "image_hash": content_hash(buf).hex(),
+                "image_size": [image.shape[1], image.shape[0]] if image is not None else None,
+                "contours": sum(contours for contours, _ in detections),
+                "candles": sum(candles for _, candles in detections),
+                "seconds": round(elapsed, 6),
+                "timings_ms": stage_timings,
+                "signal": prediction.get('signal'),
+                "error": prediction.get('error'),
+            })
+        except OSError as e:
+            # The analysis itself succeeded; only the capture is lost
+            print(f"Error writing profile: {e}")
+        if timings:
+            prediction['timings_ms'] = stage_timings
+        return prediction
+    
+    def analyze_array(self, image, debug=True, timings=False):
+        """Analyze an already decoded BGR image array"""
+        if timings:
+            with self.metrics.collect() as stage_timings:
+                prediction = self._analyze(image, debug, image)[0]
+            prediction['timings_ms'] = stage_timings
+            return prediction
+        return self._analyze(image, debug, image)[0]
+    
+    def _analyze(self, image, debug, source, use_cache=True):
+        """Run the pipeline on a decoded frame, returning (prediction, candles)"""
+        try:
+            if image is None or image.ndim != 3 or image.shape[2] != 3:
+                self.metrics.error('decode')
+                return {"error": "Could not load image"}, None
+            self.metrics.observe_image(image)
+            rejection = self._triage(image)
+            if rejection is not None:
+                return rejection, None
+            
+            # Detect and score at the working resolution
+            frame, factor = self.normalize(image)
+            
+            # Get chart analysis, reusing candles from a near-identical frame
+            candles = None
+            use_cache = use_cache and self.candle_cache.max_size > 0
+            if use_cache:
+                with self.metrics.stage('cache_lookup'):
+                    key = perceptual_hash(frame, self.cache_hash_size)
+                    candles = self.candle_cache.get(key)
+                    # The hash is too coarse to see the newest candle move; check the hit
+                    if candles is not None and not self.candles_match(frame, candles):
+                        self.stale_candle_hits += 1
+                        candles = None
+            if candles is None:
+                candles = self.detect_candles(frame)
+                if use_cache:
+                    self.candle_cache.put(key, candles)
+            with self.metrics.stage('scoring'):
+                prediction = self.generate_prediction(candles, frame)
+            
+            # Responses and overlays use original image coordinates
+            if factor != 1.0:
+                candles = candles.scaled(factor)
+            
+            self._record_history(prediction, candles, image.shape)
+            
+            if debug:
+                prediction['analysis_id'] = self._remember_overlay(candles, prediction, source)
+            
+            return prediction, candles
+            
+        except Exception as e:
+            self.metrics.error('analysis')
+            return {"error": f"Analysis failed: {str(e)}"}, None
+    
+    def _triage(self, image):
+        """Rejection response when triage rules the frame out as a chart, else None"""
+        if self.triage is None:
+            return None
+        with self.metrics.stage('triage'):
+            reason = self.triage.check(image)
+        if reason is None:
+            return None
+        self.metrics.reject(reason)
+        return {"error": "Image does not look like a candlestick chart", "rejected": reason}
+    
+    def analyze_panels_bytes(self, buf, timings=False):
+        """analyze_panels for an encoded image held in memory"""
+        if timings:
+            with self.metrics.collect() as stage_timings:
+                result = self._analyze_panels(None, buf, True)
+            result['timings_ms'] = stage_timings
+            return result
+        return self._analyze_panels(None, buf, False)
+    
+    def analyze_panels(self, image, timings=False):
+        """Split a multi-chart screenshot into panels and analyze them concurrently
+        
+        Returns {"panel_count": n, "panels": [...]} with one prediction per
+        panel, top to bottom then left to right, each carrying its panel box
+        in image pixels. A screenshot without dividers is a single panel.
+        Overlays are not kept for panel analyses. With timings=True the split
+        and every panel get their own timings_ms.
+        """
+        if timings:
+            with self.metrics.collect() as stage_timings:
+                result = self._analyze_panels(image, None, True)
+            result['timings_ms'] = stage_timings
+            return result
+        return self._analyze_panels(image, None, False)
+    
+    def _analyze_panels(self, image, buf, timings):
+        try:
+            if buf is not None:
+                with self.metrics.stage('decode'):
+                    image = decode_image(buf)
+            if image is None or image.ndim != 3 or image.shape[2] != 3:
+                self.metrics.error('decode')
+                return {"error": "Could not load image"}
+            self.metrics.observe_image(image)
+            rejection = self._triage(image)
+            if rejection is not None:
+                return rejection
+            
+            with self.metrics.stage('panels'):
+                regions = self.panel_detector.panels(image)
+            # Every panel is scaled like the whole screenshot, so thresholds match a single chart
+            factor = self.downscale_factor(image.shape[0])
+            if len(regions) == 1:
+                panels = [self._analyze_panel(image, factor, regions[0], timings)]
+            else:
+                # OpenCV releases the GIL, so panels are scaled and detected in parallel
+                pool = self._get_panel_pool()
+                futures = [pool.submit(self._analyze_panel, image, factor, region, timings)
+                           for region in regions]
+                panels = [future.result() for future in futures]
+            return {"panel_count": len(panels), "panels": panels}
+        
+        except Exception as e:
+            self.metrics.error('analysis')
+            return {"error": f"Analysis failed: {str(e)}"}
+    
+    def _analyze_panel(self, image, factor, region, timings=False):
+        """Scale, detect and score the panel at region (x, y, width, height) of image"""
+        if timings:
+            # Stage timings are per thread, so each panel collects its own
+            with self.metrics.collect() as stage_timings:
+                prediction = self._analyze_panel(image, factor, region)
+            prediction['timings_ms'] = stage_timings
+            return prediction
+        x, y, w, h = region
+        box = {"x": x, "y": y, "width": w, "height": h}
+        try:
+            frame, _ = self.normalize(image[y:y + h, x:x + w], factor)
+            candles = self.detect_candles(frame)
+            with self.metrics.stage('scoring'):
+                prediction = self.generate_prediction(candles, frame)
+            if factor != 1.0:
+                candles = candles.scaled(factor)
+            self._record_history(prediction, candles.shifted(x, y), (h, w))
+        except Exception as e:
+            self.metrics.error('analysis')
+            prediction = {"error": f"Analysis failed: {str(e)}"}
+        prediction['panel'] = box
+        return prediction
+    
+    def _record_history(self, prediction, candles, image_shape):
+        """Append the prediction to the history log when one is configured"""
+        if self.history is None:
+            return
+        try:
+            with self.metrics.stage('history'):
+                prediction['record_id'] = self.history.append(prediction, candles, image_shape)
+        except OSError as e:
+            self.metrics.error('history')
+            print(f"Error writing history: {e}")
+    
+    def px(self, value, power=1):
+        """Scale a pixel threshold (power=2 for areas) to the working resolution"""
+        return value * self.pixel_scale ** power
+    
+    def normalize(self, image, factor=None):
+        """Downscale a frame to the working height; returns (frame, factor back to original pixels)
+        
+        factor overrides the downscale, e.g. the one of the whole screenshot
+        a panel was cut from. A downscaled frame lives in this thread's buffer
+        pool and is only valid until the thread's next normalize call.
+        """
+        height, width = image.shape[:2]
+        if factor is None:
+            factor = self.downscale_factor(height)
+        if factor == 1.0:
+            return image, 1.0
+        size = (max(int(round(width / factor)), 1), max(int(round(height / factor)), 1))
+        with self.metrics.stage('normalize'):
+            frame = self.buffers.get('normalized', (size[1], size[0], 3))
+            return cv2.resize(image, size, dst=frame, interpolation=cv2.INTER_AREA), factor
+    
+    def downscale_factor(self, height):
+        """Original pixels per working pixel for a frame of this height"""
+        if not self.work_height or height <= self.work_height:
+            return 1.0
+        return height / self.work_height
+    
+    def _remember_overlay(self, candles, prediction, source):
+        """Keep what the overlay needs and return the id it can be fetched under"""
+        analysis_id = uuid.uuid4().hex
+        self.debug_store.put(analysis_id, {
+            "candles": candles,
+            "signal": prediction['signal'],
+            "confidence": prediction['confidence'],
+            "source": source,
+        })
+        self.last_analysis_id = analysis_id
+        return analysis_id
+    
+    def render_debug_image(self, analysis_id):
+        """Render and encode the overlay for an analysis, returning (bytes, mimetype) or None"""
+        record = self.debug_store.get(analysis_id)
+        if record is None:
+            return None
+        
+        source = record['source']
+        with self.metrics.stage('decode'):
+            image = source if isinstance(source, np.ndarray) else decode_image(source)
+        if image is None:
+            self.metrics.error('decode')
+            return None
+        with self.metrics.stage('overlay'):
+            debug_image = self.create_debug_overlay(image, record['candles'], record)
+        
+        if self.debug_max_size:
+            height, width = debug_image.shape[:2]
+            scale = self.debug_max_size / max(height, width)
+            if scale < 1:
+                debug_image = cv2.resize(debug_image, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                                         interpolation=cv2.INTER_AREA)
+        
+        extension, mimetype = DEBUG_IMAGE_FORMATS[self.debug_format]
+        if extension == '.jpg':
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.debug_quality]
+        elif extension == '.webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.debug_quality]
+        else:
+            params = []
+        with self.metrics.stage('encode'):
+            ok, encoded = cv2.imencode(extension, debug_image, params)
+        if not ok:
+            self.metrics.error('encode')
+            return None
+        return encoded.tobytes(), mimetype
+    
+    def analyze_many(self, images):
+        """Analyze several images on the worker pool, returning results in input order
+        
+        Items may be decoded BGR arrays or encoded image buffers. Each frame
+        is decoded, copied into its own shared memory block and dropped before
+        the next is decoded, so pixel data is never pickled and at most one
+        frame is held twice. Items past batch_max_files, or whose frame would
+        take the batch past batch_max_decoded_bytes, get an error result.
+        """
+        results = [None] * len(images)
+        futures = []
+        blocks = []
+        decoded = 0
+        try:
+            for i, item in enumerate(images):
+                if self.batch_max_files is not None and i >= self.batch_max_files:
+                    results[i] = {"error": f"Batch limit of {self.batch_max_files} images reached"}
+                    continue
+                image = item if isinstance(item, np.ndarray) else decode_image(item)
+                if image is None or image.ndim != 3 or image.shape[2] != 3 or not image.size:
+                    results[i] = {"error": "Could not load image"}
+                    continue
+                if self.batch_max_decoded_bytes is not None and decoded + image.size > self.batch_max_decoded_bytes:
+                    results[i] = {"error": "Batch decoded size limit reached"}
+                    continue
+                decoded += image.size
+                
+                shm = shared_memory.SharedMemory(create=True, size=image.size)
+                blocks.append(shm)
+                view = np.ndarray(image.shape, dtype=np.uint8, buffer=shm.buf)
+                view[...] = image
+                shape = image.shape
+                del view, image
+                futures.append((i, self._get_pool().submit(_analyze_shared_frame, shm.name, 0, shape)))
+            
+            for i, future in futures:
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = {"error": f"Analysis failed: {str(e)}"}
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+        
+        return results
+    
+    def _get_pool(self):
+        """Start the persistent worker pool on first use"""
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_batch_worker,
+                                             initargs=(self._worker_options,))
+        return self._pool
+    
+    def _get_panel_pool(self):
+        """Start the panel thread pool on first use"""
+        with self._panel_lock:
+            if self._panel_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._panel_pool = ThreadPoolExecutor(max_workers=self.panel_workers,
+                                                      thread_name_prefix='ghostcore-panel')
+        return self._panel_pool
+    
+    def open_stream(self):
+        """Start a live-frame session and return its id"""
+        session = StreamSession(uuid.uuid4().hex, self)
+        self.streams.put(session.id, session)
+        return session.id
+    
+    def get_stream(self, session_id):
+        return self.streams.get(session_id)
+    
+    def stream_frame(self, session_id, image):
+        """Feed the next frame of a live session"""
+        session = self.streams.get(session_id)
+        if session is None:
+            return {"error": "Unknown or expired stream session"}
+        if image is None or image.ndim != 3 or image.shape[2] != 3:
+            return {"error": "Could not load image"}
+        try:
+            result = session.push(image)
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+        # Refresh the idle timeout
+        self.streams.put(session_id, session)
+        return result
+    
+    def close_stream(self, session_id):
+        return self.streams.pop(session_id) is not None
+    
+    def cache_stats(self):
+        """Hit/miss counters for both cache tiers"""
+        stats = {
+            "results": self.result_cache.stats(),
+            "candles": dict(self.candle_cache.stats(), stale=self.stale_candle_hits),
+        }
+        if self.region_detector is not None:
+            stats["layouts"] = self.region_detector.cache.stats()
+        stats["buffers"] = self.buffers.stats()
+        return stats
+    
+    def close(self):
+        """Shut down the worker pools and close the history log"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._panel_pool is not None:
+            self._panel_pool.shutdown()
+            self._panel_pool = None
+        if self.history is not None:
+            self.history.close()
+    
+    def warm_up(self):
+        """Load OpenCV and NumPy, build the colour table and run one dummy analysis
+        
+        Moves one-off costs out of the first real request. Nothing is cached
+        or logged to history. Returns the seconds spent.
+        """
+        start = time.perf_counter()
+        color_lut()
+        
+        # A dark chart with alternating candles exercises every detection stage
+        height = self.work_height or self.REFERENCE_HEIGHT
+        frame = np.full((height, height * 16 // 9, 3), 24, dtype=np.uint8)
+        for i in range(10):
+            x = 60 + i * 60
+            top = height // 3 + (i % 3) * 20
+            color = (80, 200, 60) if i % 2 else (60, 60, 220)
+            cv2.rectangle(frame, (x, top), (x + 24, top + 90), color, -1)
+        
+        candles = self.detect_candles(frame)
+        prediction = self.generate_prediction(candles, frame)
+        overlay = self.create_debug_overlay(frame, candles, prediction)
+        cv2.imencode(DEBUG_IMAGE_FORMATS[self.debug_format][0], overlay)
+        return time.perf_counter() - start
+    
+    def detect_candles(self, image):
+        """Detect candlesticks using OpenCV without OCR"""
+        detect = self.detect_region_progressive if self.progressive else self.detect_region
+        if self.region_detector is None:
+            return detect(image)
+        
+        # Only scan the chart plotting area, but report full-image coordinates
+        with self.metrics.stage('roi'):
+            x, y, w, h = self.chart_region(image)
+        candles = detect(image[y:y + h, x:x + w], image.shape[0])
+        return candles.shifted(x, y)
+    
+    def candles_match(self, frame, candles):
+        """Whether candles detected on a near-identical frame still hold for frame
+        
+        Checked on the colour masks of the columns from the first candle to
+        one candle spacing past the last one: every body must still end
+        where it did (its inner top and bottom rows are at least half filled
+        with its colour, and the rows a little beyond them are not) and no
+        column in the slot after the last candle may hold a candle's height
+        of candle colour. An empty set never matches, so it is re-detected.
+        """
+        if not len(candles):
+            return False
+        edge = max(int(round(self.px(2))), 1)
+        pad = max(int(round(self.px(6))), 1)
+        centers = candles['center_x']
+        pitch = (centers[-1] - centers[0]) / (len(candles) - 1) if len(candles) > 1 else 0
+        left = int(candles['x'].min())
+        right = int((candles['x'] + candles['width']).max()) + edge
+        masks = classify_colors(frame[:, left:right + int(max(pitch, self.px(16)))])
+        rows = masks.shape[0]
+        
+        for x, y, w, h, kind in zip(candles['x'].tolist(), candles['y'].tolist(), candles['width'].tolist(),
+                                    candles['height'].tolist(), candles['type'].tolist()):
+            x -= left
+            if y + h > rows:
+                return False
+            # Rows from pad beyond the top edge to pad beyond the bottom edge
+            top = max(y - edge - pad, 0)
+            bottom = min(y + h + edge + pad, rows)
+            filled = np.count_nonzero(masks[top:bottom, x:x + w, 0 if kind == BULLISH else 1], axis=1)
+            body = filled >= (w + 1) // 2
+            inset = min(edge, (h - 1) // 2)
+            if not (body[y + inset - top] and body[y + h - 1 - inset - top]):
+                return False
+            if body[:max(y - edge - top, 0)].any() or body[y + h + edge - top:].any():
+                return False
+        
+        column_pixels = np.count_nonzero(masks[:, right - left:].max(axis=2), axis=0)
+        return not (column_pixels >= max(int(round(self.px(8))), 1)).any()
+    
+    def chart_region(self, image):
+        """(x, y, width, height) of the plotting area, or the whole frame without ROI detection"""
+        if self.region_detector is None:
+            return (0, 0, image.shape[1], image.shape[0])
+        return self.region_detector.region(image)
+    
+    def detect_region(self, image, image_height=None):
+        """Detect candles in an image or crop; size limits use image_height when given"""
+        if self.extractor == 'profile':
+            return self.detect_region_profile(image, image_height)
+        return self.detect_region_contours(image, image_height)
+    
+    def detect_region_progressive(self, image, image_height=None):
+        """detect_region over windows grown leftward from the right edge, stopping early
+        
+        Only the newest lookback candles are kept, so the scan ends at the
+        first window that holds that many clear of its left cut. Candles
+        within PROGRESSIVE_MARGIN of the cut may be clipped and are left to a
+        wider window. The next window is sized from the candle spacing seen so
+        far (or doubled), growing by at least half the first window every
+        pass. Once the windows tried would add up to more than half the
+        image, the whole image is scanned instead, so a chart with too few
+        candles costs at most about one and a half full scans.
+        """
+        width = image.shape[1]
+        height = image_height or image.shape[0]
+        if not self.lookback:
+            return self.detect_region(image, height)
+        
+        margin = self.px(self.PROGRESSIVE_MARGIN)
+        window = int(self.px(self.PROGRESSIVE_WINDOW))
+        # Coincident or crowded candles give no usable spacing; this keeps the scan moving
+        min_growth = max(window // 2, 1)
+        scanned = 0
+        while scanned + window <= width // 2:
+            scanned += window
+            start = width - window
+            candles = self.detect_region(image[:, start:], height)
+            clear = candles[candles['x'] > margin]
+            if len(clear) >= self.lookback:
+                return clear.shifted(start, 0)
+            
+            grown = window * 2
+            if len(clear) >= 2:
+                pitch = (clear['center_x'][-1] - clear['center_x'][0]) / (len(clear) - 1)
+                if pitch > 0:
+                    # Reach back to where the oldest wanted candle should sit at the spacing seen
+                    left = clear['center_x'][-1] - self.lookback * pitch
+                    grown = max(int(window - left + 2 * margin), window + int(2 * pitch))
+            window = max(grown, window + min_growth)
+        return self.detect_region(image, height)
+    
+    def detect_region_contours(self, image, image_height=None):
+        """Candle bodies from contours of the cleaned colour masks (no wick data)"""
+        try:
+            height = image_height or image.shape[0]
+            
+            rows, cols = image.shape[:2]
+            buffers = self.buffers
+            
+            # Preprocess image to improve detection
+            # Apply Gaussian blur to reduce noise
+            with self.metrics.stage('blur'):
+                blurred = cv2.GaussianBlur(image, (3, 3), 0, dst=buffers.get('blurred', (rows, cols, 3)))
+            
+            # Classify every pixel with one table lookup; channel 0 is the
+            # green mask and channel 1 the red mask
+            with self.metrics.stage('classify'):
+                masks = classify_colors(blurred, bgra=buffers.get('bgra', (rows, cols, 4)),
+                                        packed=buffers.get('packed', (rows, cols), 'uint16'))
+            
+        except Exception as e:
+            print(f"Error in color conversion: {e}")
+            return CandleSet()
+        
+        with self.metrics.stage('morphology'):
+            kernel_small, kernel_medium, horizontal_kernel = self.morphology_kernels()
+            cleaned = []
+            for channel, name in ((0, 'green'), (1, 'red')):
+                # Split the packed classifier output into separate masks; OpenCV's
+                # single-channel morphology is faster than running it on the 2-channel image
+                mask = cv2.extractChannel(masks, channel, dst=buffers.get(name, (rows, cols)))
+                clean = buffers.get(name + '_clean', (rows, cols))
+                
+                # Remove small noise first, fill gaps in candle bodies, then remove
+                # very thin horizontal lines that might be grid lines
+                cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel_small, dst=clean)
+                cv2.morphologyEx(clean, cv2.MORPH_CLOSE, kernel_medium, dst=mask)
+                cv2.morphologyEx(mask, cv2.MORPH_OPEN, horizontal_kernel, dst=clean)
+                cleaned.append(clean)
+            green_mask, red_mask = cleaned
+        
+        # Find contours
+        try:
+            with self.metrics.stage('contours'):
+                green_contours, _ = cv2.findContours(green_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                red_contours, _ = cv2.findContours(red_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        except Exception as e:
+            print(f"Error finding contours: {e}")
+            return CandleSet()
+        
+        with self.metrics.stage('candle_filter'):
+            # Collect candidate boxes, then validate them all in one vectorized pass
+            boxes = []
+            areas = []
+            types = []
+            for candle_type, contours in ((BULLISH, green_contours), (BEARISH, red_contours)):
+                for contour in contours:
+                    area = cv2.contourArea(contour)
+                    if area > self.px(100, 2):  # Increased threshold to filter more noise
+                        boxes.append(cv2.boundingRect(contour))
+                        areas.append(area)
+                        types.append(candle_type)
+            
+            candles = CandleSet.from_boxes(boxes, areas, types)
+            candles = candles[self.valid_candle_mask(candles, height)]
+            
+            # Sort candles by x position (time order)
+            candles = candles.sorted()
+        
+        self.metrics.observe_candles(len(green_contours) + len(red_contours), len(candles))
+        return self.recent(candles)
+    
+    def detect_region_profile(self, image, image_height=None):
+        """Candle bodies and wicks from column and row profiles of the colour masks
+        
+        The masks are projected onto columns and every x-run of columns of one
+        colour is a candle. Per-row pixel counts of each run, read from an
+        integral image for all runs at once, give the body (rows at least half
+        the run wide) and the wick tips (the coloured rows in the run's centre
+        columns contiguous with the body). high/low hold the wick tips.
+        """
+        height = image_height or image.shape[0]
+        rows, cols = image.shape[:2]
+        buffers = self.buffers
+        
+        try:
+            # No blur: wicks are 1 px wide and body edges should stay sharp
+            with self.metrics.stage('classify'):
+                masks = classify_colors(image, bgra=buffers.get('bgra', (rows, cols, 4)),
+                                        packed=buffers.get('packed', (rows, cols), 'uint16'))
+        except Exception as e:
+            print(f"Error in color conversion: {e}")
+            return CandleSet()
+        
+        with self.metrics.stage('profile'):
+            # Coloured pixels per column and class (mask values are 0 or 255)
+            column_counts = cv2.reduce(masks, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S)[0] // 255
+            green_counts, red_counts = column_counts[:, 0], column_counts[:, 1]
+            occupied = np.maximum(green_counts, red_counts) >= max(round(self.px(2)), 1)
+            labels = np.where(occupied, np.where(green_counts >= red_counts, 1, 2), 0)
+            
+            # Runs of equally labelled columns
+            edges = np.flatnonzero(np.diff(labels, prepend=0, append=0))
+            starts, ends = edges[:-1], edges[1:]
+            runs = labels[starts] > 0
+            starts, ends = starts[runs], ends[runs]
+            if not len(starts):
+                # Nothing coloured; OpenCV rejects the empty per-run arrays below
+                self.metrics.observe_candles(0, 0)
+                return CandleSet()
+            bullish = labels[starts] == 1
+            widths = ends - starts
+            
+            # Pixels of the run's own colour in every row, shape (rows, runs)
+            integral = cv2.integral(masks, sdepth=cv2.CV_32S,
+                                    sum=buffers.get('integral', (rows + 1, cols + 1, 2), 'int32', frame=(rows, cols)))
+            channel = np.where(bullish, 0, 1)
+            spans = integral[:, ends, channel] - integral[:, starts, channel]
+            counts = np.diff(spans, axis=0) // 255
+            
+            # Body rows span at least half the run; wicks continue to the first empty row
+            body_rows = counts >= np.maximum((widths + 1) // 2, 2)
+            has_body = body_rows.any(axis=0)
+            body_top = np.argmax(body_rows, axis=0)
+            body_bottom = rows - np.argmax(body_rows[::-1], axis=0)
+            # Wicks are traced in the centre columns only, so stray pixels
+            # elsewhere in the run cannot extend them, and a vertical close
+            # bridges pixels lost to noise
+            centers = starts + widths // 2
+            reach = np.maximum(widths // 6, 1)
+            center_counts = np.diff(integral[:, np.minimum(centers + reach + 1, ends), channel] -
+                                    integral[:, np.maximum(centers - reach, starts), channel], axis=0)
+            bridge = 2 * max(int(round(self.px(1))), 1) + 1
+            wick_rows = cv2.morphologyEx((center_counts > 0).view(np.uint8), cv2.MORPH_CLOSE,
+                                         np.ones((bridge, 1), np.uint8))
+            row_index = np.arange(rows)[:, None]
+            empty = wick_rows == 0
+            high = np.where(empty & (row_index < body_top), row_index, -1).max(axis=0) + 1
+            low = np.where(empty & (row_index >= body_bottom), row_index, rows).min(axis=0) - 1
+            
+            run_index = np.arange(len(starts))
+            body_height = body_bottom - body_top
+            area = (spans[body_bottom, run_index] - spans[body_top, run_index]) // 255
+            
+            # Same size limits as the contour path, applied to the full candle range
+            extent = low - high + 1
+            valid = (has_body & (widths >= self.px(3)) & (extent >= self.px(8)) &
+                     (extent <= height * 0.6) & (widths <= extent) &
+                     (area >= widths * body_height * 0.6))
+            
+            candles = CandleSet.from_boxes(
+                np.stack([starts, body_top, widths, body_height], axis=1)[valid],
+                area[valid], np.where(bullish, BULLISH, BEARISH)[valid], high[valid], low[valid],
+            )
+        
+        self.metrics.observe_candles(len(starts), len(candles))
+        return self.recent(candles)
+    
+    def recent(self, candles):
+        """The lookback most recent candles, or all of them without a lookback"""
+        return candles[-self.lookback:] if self.lookback else candles
+    
+    def morphology_kernels(self):
+        """(small open, medium close, horizontal open) kernels for the working resolution"""
+        if self._kernels is None:
+            # Enhanced morphological operations to clean up
+            # Use different kernel sizes for better cleaning
+            self._kernels = (
+                np.ones((2,2), np.uint8),
+                np.ones((3,3), np.uint8),
+                cv2.getStructuringElement(cv2.MORPH_RECT, (max(int(round(self.px(15))), 3), 1)),
+            )
+        return self._kernels
+    
+    def is_valid_candle(self, width, height, image_height, area):
+        """Filter valid candle shapes with enhanced criteria"""
+        # Basic geometry filters
+        if height < self.px(8) or width < self.px(3):  # Minimum size requirements
+            return False
+        if height > image_height * 0.6:  # Too tall (reduced from 0.8)
+            return False
+        if width > height:  # Width should never exceed height for candles
+            return False
+        if area < width * height * 0.6:  # Area should be substantial relative to bounding box
+            return False
+        
+        # Additional shape validation
+        aspect_ratio = height / width if width > 0 else 0
+        if aspect_ratio < 1.5 or aspect_ratio > 20:  # Reasonable aspect ratio range
+            return False
+            
+        return True
+    
+    def valid_candle_mask(self, candles, image_height):
+        """Vectorized is_valid_candle over a CandleSet, including the aspect ratio check"""
+        w = candles['width']
+        h = candles['height']
+        aspect_ratio = candles['aspect_ratio']
+        return ((h >= self.px(8)) & (w >= self.px(3)) &
+                (h <= image_height * 0.6) &
+                (w <= h) &
+                (candles['area'] >= w * h * 0.6) &
+                (aspect_ratio >= 1.5) & (aspect_ratio <= 20))
+    
+    def generate_prediction(self, candles, image):
+        """Generate trading signal based on candle analysis"""
+        # Need at least 3 valid candles for basic analysis
+        if len(candles) < 3:
+            return {
+                "signal": "NO SIGNAL",
+                "confidence": 0,
+                "reason": f"Insufficient candle data - need 3+ candles, found {len(candles)}",
+                "analysis": {"candles_detected": len(candles)}
+            }
+        
+        # Patterns and momentum use the last 6 candles; trend and levels use a
+        # deep lookback when more than 8 candles were kept
+        recent_candles = candles[-6:] if len(candles) >= 6 else candles
+        deep = len(candles) > 8
+        
+        # Initialize analysis
+        analysis = {
+            "trend": "Unknown",
+            "pattern": "None", 
+            "momentum": "Neutral",
+            "support_resistance": "None",
+            "signal_strength": 0
+        }
+        if deep:
+            analysis['lookback_candles'] = len(candles)
+        
+        signal_strength = 0
+        
+        # 1. Pattern Detection (flexible scoring)
+        pattern_result = self.detect_patterns(recent_candles)
+        analysis['pattern'] = pattern_result['pattern']
+        signal_strength += pattern_result['score']
+        
+        # 2. Momentum Analysis
+        momentum_result = self.analyze_momentum(recent_candles)
+        analysis['momentum'] = momentum_result['momentum']
+        signal_strength += momentum_result['score']
+        
+        # 3. Trend Analysis
+        if deep:
+            trend_result = self.analyze_trend_regression(candles)
+        else:
+            trend_result = self.analyze_trend(recent_candles)
+        analysis['trend'] = trend_result['trend']
+        signal_strength += trend_result['score']
+        
+        # 4. Support/Resistance
+        sr_result = self.analyze_support_resistance(candles if deep else recent_candles)
+        analysis['support_resistance'] = sr_result['level']
+        signal_strength += sr_result['score']
+        
+        # 5. Quality bonus
+        quality_bonus = self.calculate_quality_bonus(recent_candles)
+        signal_strength += quality_bonus
+        
+        # Calculate confidence (0-100%)
+        max_possible_score = 80  # Realistic maximum
+        confidence = min((signal_strength / max_possible_score) * 100, 100)
+        
+        # Determine signal based on analysis
+        signal = self.determine_signal(recent_candles, analysis, confidence)
+        
+        # Get current Bangladesh time
+        current_time = bangladesh_now()
+        
+        return {
+            "signal": signal,
+            "confidence": round(confidence, 1),
+            "timeframe": "1 Minute",
+            "local_time": current_time.strftime("%H:%M (UTC+6)"),
+            "trend": analysis['trend'],
+            "pattern": analysis['pattern'],
+            "momentum": analysis['momentum'],
+            "support_resistance": analysis['support_resistance'],
+            "candle_count": len(recent_candles),
+            "signal_strength": round(signal_strength, 1),
+            "analysis": analysis
+        }
+    
+    def detect_reversal_patterns(self, candles):
+        """Detect reversal patterns with enhanced accuracy"""
+        if len(candles) < 2:
+            return {"score": 0, "pattern": "None"}
+        
+        last_candle = candles[-1]
+        prev_candle = candles[-2]
+        
+        # Enhanced Engulfing Pattern Detection
+        if (last_candle['type'] != prev_candle['type'] and 
+            last_candle['height'] > prev_candle['height'] * 1.4 and  # Stricter size requirement
+            last_candle['area'] > prev_candle['area'] * 1.3):  # Volume confirmation
+            
+            # Additional validation: check position overlap
+            prev_top = prev_candle['y']
+            prev_bottom = prev_candle['y'] + prev_candle['height']
+            last_top = last_candle['y']
+            last_bottom = last_candle['y'] + last_candle['height']
+            
+            # True engulfing: last candle should engulf previous candle
+            if last_top <= prev_top and last_bottom >= prev_bottom:
+                pattern_name = f"{last_candle['type'].title()} Engulfing"
+                return {"score": 30, "pattern": pattern_name}
+        
+        # Enhanced Pin Bar Detection
+        if (last_candle['body_ratio'] < 0.25 and  # Stricter body ratio
+            last_candle['height'] > self.px(20)):  # Minimum height requirement
+            
+            # Check if it's at a significant level (compare with previous candles)
+            if len(candles) >= 3:
+                prev_avg_height = candles['height'][-3:-1].mean()
+                if last_candle['height'] > prev_avg_height * 1.2:  # Stands out
+                    pattern_name = f"{last_candle['type'].title()} Pin Bar"
+                    return {"score": 25, "pattern": pattern_name}
+        
+        # Enhanced Doji Detection
+        if (last_candle['body_ratio'] < 0.15 and 
+            last_candle['height'] > self.px(15)):  # Must have meaningful size
+            return {"score": 18, "pattern": "Doji"}
+        
+        return {"score": 0, "pattern": "None"}
+    
+    def analyze_color_momentum(self, candles):
+        """Analyze momentum based on candle colors"""
+        if len(candles) < 3:
+            return {"score": 0, "momentum": "Neutral"}
+        
+        bullish_count = np.count_nonzero(candles['type'] == BULLISH)
+        bearish_count = len(candles) - bullish_count
+        
+        # Strong momentum
+        if bullish_count >= len(candles) * 0.7:
+            return {"score": 18, "momentum": "Strong Bullish"}
+        elif bearish_count >= len(candles) * 0.7:
+            return {"score": 18, "momentum": "Strong Bearish"}
+        
+        # Recent momentum change
+        recent_3 = candles[-3:]
+        recent_bullish = np.count_nonzero(recent_3['type'] == BULLISH)
+        
+        if recent_bullish >= 2:
+            return {"score": 12, "momentum": "Bullish Shift"}
+        elif recent_bullish <= 1:
+            return {"score": 12, "momentum": "Bearish Shift"}
+        
+        return {"score": 5, "momentum": "Neutral"}
+    
+    def analyze_trend_pattern(self, candles):
+        """Analyze trend patterns (Higher Highs/Lows, Lower Highs/Lows)"""
+        if len(candles) < 3:
+            return {"score": 0, "trend": "Unknown"}
+        
+        # Simple trend analysis based on y positions
+        highs = candles['y']  # y increases downward in image
+        lows = candles['y'] + candles['height']
+        
+        # Check for trend
+        if len(highs) >= 3:
+            recent_highs = highs[-3:]
+            recent_lows = lows[-3:]
+            
+            # Downtrend (lower highs, lower lows)
+            if (recent_highs[0] < recent_highs[1] < recent_highs[2] and
+                recent_lows[0] < recent_lows[1] < recent_lows[2]):
+                return {"score": 15, "trend": "Strong Downtrend"}
+            
+            # Uptrend (higher highs, higher lows)
+            if (recent_highs[0] > recent_highs[1] > recent_highs[2] and
+                recent_lows[0] > recent_lows[1] > recent_lows[2]):
+                return {"score": 15, "trend": "Strong Uptrend"}
+        
+        return {"score": 8, "trend": "Sideways"}
+    
+    def analyze_support_resistance(self, candles):
+        """Basic support/resistance analysis"""
+        if len(candles) < 4:
+            return {"score": 0, "level": "None"}
+        
+        # Look for similar price levels (y positions)
+        y_positions = candles['y'] + candles['height'] // 2
+        
+        # Candles within px(10) of each level (but the last), counted with two
+        # binary searches over the sorted positions instead of a pairwise scan
+        ordered = np.sort(y_positions)
+        levels = y_positions[:-1]
+        tolerance = self.px(10)
+        matches = (np.searchsorted(ordered, levels + tolerance, side='left') -
+                   np.searchsorted(ordered, levels - tolerance, side='right'))
+        if np.any(matches >= 3):
+            return {"score": 15, "level": "Key Level Touch"}
+        
+        return {"score": 5, "level": "Minor Level"}
+    
+    def noise_filter(self, candles):
+        """Filter out false signals"""
+        if len(candles) < 2:
+            return 0
+        
+        # Check for very small candles (likely noise)
+        small_candles = np.count_nonzero(candles['height'] < self.px(15))
+        if small_candles > len(candles) * 0.5:
+            return -5  # Penalty for too much noise
+        
+        return 8  # Clean candles bonus
+    
+    def validate_candle_quality(self, candles):
+        """Validate that detected candles are reasonable"""
+        if len(candles) < 2:
+            return False
+        
+        # Check candle size consistency
+        avg_height = candles['height'].mean()
+        
+        # Reject if candles are too small (likely noise)
+        if avg_height < self.px(12):  # More lenient
+            return False
+        
+        # Validate candle spacing if we have enough candles
+        if len(candles) >= 3:
+            avg_spacing = np.diff(candles['center_x']).mean()
+            
+            # Check if spacings are reasonable (more lenient)
+            if avg_spacing < self.px(5) or avg_spacing > self.px(300):
+                return False
+        
+        return True
+    
+    def detect_patterns(self, candles):
+        """Detect trading patterns with realistic scoring"""
+        if len(candles) < 2:
+            return {"score": 0, "pattern": "None"}
+        
+        last_candle = candles[-1]
+        prev_candle = candles[-2]
+        
+        # Engulfing Pattern (relaxed criteria)
+        if (last_candle['type'] != prev_candle['type'] and 
+            last_candle['height'] > prev_candle['height'] * 1.2):
+            
+            prev_top = prev_candle['y']
+            prev_bottom = prev_candle['y'] + prev_candle['height']
+            last_top = last_candle['y']
+            last_bottom = last_candle['y'] + last_candle['height']
+            
+            # Check for engulfing (some overlap allowed)
+            if (last_top <= prev_top + self.px(5) and last_bottom >= prev_bottom - self.px(5)):
+                pattern_name = f"{last_candle['type'].title()} Engulfing"
+                return {"score": 25, "pattern": pattern_name}
+        
+        if last_candle['high'] >= 0:
+            # Pin Bar and Doji from measured wicks
+            wick_pattern = self.detect_wick_pattern(last_candle)
+            if wick_pattern is not None:
+                return wick_pattern
+        else:
+            # Pin Bar Pattern
+            if last_candle['body_ratio'] < 0.3 and last_candle['height'] > self.px(15):
+                pattern_name = f"{last_candle['type'].title()} Pin Bar"
+                return {"score": 20, "pattern": pattern_name}
+            
+            # Doji Pattern
+            if last_candle['body_ratio'] < 0.2:
+                return {"score": 15, "pattern": "Doji"}
+        
+        # Consecutive candles (momentum)
+        if len(candles) >= 3:
+            last_3 = candles[-3:]
+            same_type_count = np.count_nonzero(last_3['type'] == last_3['type'][-1])
+            
+            if same_type_count >= 2:
+                pattern_name = f"{last_candle['type'].title()} Momentum"
+                return {"score": 18, "pattern": pattern_name}
+        
+        # Large candle (breakout potential)
+        if len(candles) >= 3:
+            avg_height = candles['height'][-3:-1].mean()
+            if last_candle['height'] > avg_height * 1.4:
+                pattern_name = f"Large {last_candle['type'].title()} Candle"
+                return {"score": 15, "pattern": pattern_name}
+        
+        # Small pattern (consolidation)
+        return {"score": 8, "pattern": "Standard Candle"}
+    
+    def detect_wick_pattern(self, candle):
+        """Pin Bar or Doji for a candle with wick data, or None"""
+        extent = candle['low'] - candle['high'] + 1
+        body = candle['height']
+        upper_wick = candle['y'] - candle['high']
+        lower_wick = candle['low'] - (candle['y'] + body - 1)
+        
+        # Pin Bar: one wick at least 60% of the range and twice the body
+        if extent > self.px(15) and body <= extent / 3:
+            if lower_wick >= extent * 0.6 and lower_wick >= body * 2:
+                return {"score": 20, "pattern": "Bullish Pin Bar"}
+            if upper_wick >= extent * 0.6 and upper_wick >= body * 2:
+                return {"score": 20, "pattern": "Bearish Pin Bar"}
+        
+        # Doji: open and close (almost) equal
+        if body <= extent * 0.1:
+            return {"score": 15, "pattern": "Doji"}
+        return None
+    
+    def analyze_momentum(self, candles):
+        """Analyze momentum with flexible scoring"""
+        if len(candles) < 3:
+            return {"score": 5, "momentum": "Limited Data"}
+        
+        # Count candle types in available data
+        bullish_count = np.count_nonzero(candles['type'] == BULLISH)
+        bearish_count = len(candles) - bullish_count
+        
+        # Strong momentum (70%+ same direction)
+        if bullish_count >= len(candles) * 0.7:
+            return {"score": 20, "momentum": "Strong Bullish"}
+        elif bearish_count >= len(candles) * 0.7:
+            return {"score": 20, "momentum": "Strong Bearish"}
+        
+        # Moderate momentum (60%+ same direction)
+        if bullish_count >= len(candles) * 0.6:
+            return {"score": 15, "momentum": "Bullish"}
+        elif bearish_count >= len(candles) * 0.6:
+            return {"score": 15, "momentum": "Bearish"}
+        
+        # Recent momentum (last 3 candles)
+        if len(candles) >= 3:
+            recent_3 = candles[-3:]
+            recent_bullish = np.count_nonzero(recent_3['type'] == BULLISH)
+            
+            if recent_bullish >= 2:
+                return {"score": 12, "momentum": "Recent Bullish"}
+            elif recent_bullish <= 1:
+                return {"score": 12, "momentum": "Recent Bearish"}
+        
+        return {"score": 8, "momentum": "Neutral"}
+    
+    def analyze_trend(self, candles):
+        """Analyze trend with flexible criteria"""
+        if len(candles) < 3:
+            return {"score": 5, "trend": "Limited Data"}
+        
+        # Use candle positions for trend analysis
+        positions = candles['y'] + candles['height'] // 2
+        
+        if len(positions) >= 3:
+            # Compare first and last thirds
+            first_third = positions[:len(positions)//3]
+            last_third = positions[-len(positions)//3:]
+            
+            avg_first = first_third.mean()
+            avg_last = last_third.mean()
+            
+            diff = avg_last - avg_first
+            
+            # Trend detection (more lenient)
+            if diff > self.px(8):
+                return {"score": 15, "trend": "Downtrend"}
+            elif diff < -self.px(8):
+                return {"score": 15, "trend": "Uptrend"}
+            else:
+                return {"score": 10, "trend": "Sideways"}
+        
+        return {"score": 8, "trend": "Neutral"}
+    
+    def analyze_trend_regression(self, candles):
+        """analyze_trend for a deep lookback: least-squares slope of the mid positions
+        
+        The slope comes from one pass of running sums, and the drift it predicts
+        between the first and last thirds is held to the same px(8) threshold.
+        """
+        n = len(candles)
+        if n < 3:
+            return {"score": 5, "trend": "Limited Data"}
+        
+        positions = candles['y'] + candles['height'] // 2
+        # Candle index centred on its mean, so sum(t) == 0 and sum(t * t) is closed-form
+        t = np.arange(n) - (n - 1) / 2
+        slope = np.dot(t, positions) / (n * (n * n - 1) / 12)
+        diff = slope * (n - n // 3)
+        
+        if diff > self.px(8):
+            return {"score": 15, "trend": "Downtrend"}
+        elif diff < -self.px(8):
+            return {"score": 15, "trend": "Uptrend"}
+        return {"score": 10, "trend": "Sideways"}
+    
+    def calculate_quality_bonus(self, candles):
+        """Calculate bonus points for candle quality"""
+        if len(candles) < 2:
+            return 0
+        
+        # Size consistency bonus
+        avg_height = candles['height'].mean()
+        
+        if avg_height > self.px(20):  # Good sized candles
+            return 5
+        elif avg_height > self.px(15):  # Decent sized candles
+            return 3
+        
+        return 0
+    
+    def determine_signal(self, candles, analysis, confidence):
+        """Determine final signal based on analysis"""
+        # Minimum confidence threshold
+        if confidence < 45:
+            return "NO SIGNAL"
+        
+        last_candle = candles[-1]
+        
+        # Priority 1: Strong patterns
+        if "Engulfing" in analysis['pattern']:
+            if "Bullish" in analysis['pattern']:
+                return "CALL"
+            elif "Bearish" in analysis['pattern']:
+                return "PUT"
+        
+        # Priority 2: Pin bars (reversal signals)
+        if "Pin Bar" in analysis['pattern']:
+            if "Bullish" in analysis['pattern']:
+                return "CALL"
+            elif "Bearish" in analysis['pattern']:
+                return "PUT"
+        
+        # Priority 3: Momentum signals
+        if confidence >= 60:
+            if "Bullish" in analysis['momentum']:
+                return "CALL" 
+            elif "Bearish" in analysis['momentum']:
+                return "PUT"
+        
+        # Priority 4: Last candle direction (if confidence is decent)
+        if confidence >= 55:
+            if last_candle['type'] == 'bullish':
+                return "CALL"
+            elif last_candle['type'] == 'bearish':
+                return "PUT"
+        
+        return "NO SIGNAL"
+    
+    def score_windows(self, candles, window=6):
+        """Score many candle windows at once with the generate_prediction rules
+        
+        candles is a CandleSet or structured array: 1-D is scored as every
+        sliding window of the given length (row i ends at candle i + window - 1),
+        2-D is taken as one window per row. window must be 3 to 6, the sizes
+        generate_prediction scores whole. Returns a WINDOW_SCORE_FIELDS array
+        whose signal, pattern, momentum, trend and support_resistance columns
+        hold history code table indices and whose confidence and
+        signal_strength are rounded like the scalar path.
+        """
+        data = candles.data if isinstance(candles, CandleSet) else np.asarray(candles)
+        if data.ndim == 1:
+            if not 3 <= window <= 6:
+                raise ValueError(f"window must be between 3 and 6, got {window}")
+            if len(data) < window:
+                return np.zeros(0, dtype=WINDOW_SCORE_FIELDS)
+            windows = np.lib.stride_tricks.sliding_window_view(data, window)
+        else:
+            windows = data
+            if not 3 <= windows.shape[1] <= 6:
+                raise ValueError(f"window must be between 3 and 6, got {windows.shape[1]}")
+        
+        scores = np.zeros(len(windows), dtype=WINDOW_SCORE_FIELDS)
+        for start in range(0, len(windows), self.SCORE_CHUNK):
+            stop = start + self.SCORE_CHUNK
+            self._score_window_chunk(windows[start:stop], scores[start:stop])
+        return scores
+    
+    def _score_window_chunk(self, windows, out):
+        """Vectorized detect_patterns .. determine_signal for a (windows, n) block"""
+        n = windows.shape[1]
+        types = windows['type']
+        y = windows['y']
+        heights = windows['height']
+        last_type = types[:, -1]
+        last_bullish = last_type == BULLISH
+        last_y = y[:, -1]
+        last_height = heights[:, -1]
+        
+        def by_type(bullish_name, bearish_name):
+            return np.where(last_bullish, PATTERN_NAMES.index(bullish_name),
+                            PATTERN_NAMES.index(bearish_name))
+        
+        # Pattern (detect_patterns / detect_wick_pattern), first match wins
+        prev_y = y[:, -2]
+        prev_height = heights[:, -2]
+        engulfing = ((last_type != types[:, -2]) & (last_height > prev_height * 1.2) &
+                     (last_y <= prev_y + self.px(5)) &
+                     (last_y + last_height >= prev_y + prev_height - self.px(5)))
+        
+        high = windows['high'][:, -1]
+        low = windows['low'][:, -1]
+        wicks = high >= 0
+        extent = low - high + 1
+        upper_wick = last_y - high
+        lower_wick = low - (last_y + last_height - 1)
+        wick_pin = wicks & (extent > self.px(15)) & (last_height <= extent / 3)
+        bullish_wick_pin = wick_pin & (lower_wick >= extent * 0.6) & (lower_wick >= last_height * 2)
+        bearish_wick_pin = wick_pin & (upper_wick >= extent * 0.6) & (upper_wick >= last_height * 2)
+        wick_doji = wicks & (last_height <= extent * 0.1)
+        
+        body_ratio = windows['body_ratio'][:, -1]
+        ratio_pin = ~wicks & (body_ratio < 0.3) & (last_height > self.px(15))
+        ratio_doji = ~wicks & (body_ratio < 0.2)
+        
+        same_type = np.count_nonzero(types[:, -3:] == last_type[:, None], axis=1) >= 2
+        large = last_height > heights[:, -3:-1].mean(axis=1) * 1.4
+        
+        pattern_conditions = [engulfing, bullish_wick_pin, bearish_wick_pin, ratio_pin,
+                              wick_doji | ratio_doji, same_type, large]
+        pattern = np.select(pattern_conditions, [
+            by_type('Bullish Engulfing', 'Bearish Engulfing'),
+            PATTERN_NAMES.index('Bullish Pin Bar'),
+            PATTERN_NAMES.index('Bearish Pin Bar'),
+            by_type('Bullish Pin Bar', 'Bearish Pin Bar'),
+            PATTERN_NAMES.index('Doji'),
+            by_type('Bullish Momentum', 'Bearish Momentum'),
+            by_type('Large Bullish Candle', 'Large Bearish Candle'),
+        ], PATTERN_NAMES.index('Standard Candle'))
+        strength = np.select(pattern_conditions, [25, 20, 20, 20, 15, 18, 15], 8)
+        
+        # Momentum (analyze_momentum)
+        bullish_count = np.count_nonzero(types == BULLISH, axis=1)
+        bearish_count = n - bullish_count
+        recent_bullish = np.count_nonzero(types[:, -3:] == BULLISH, axis=1) >= 2
+        momentum_conditions = [bullish_count >= n * 0.7, bearish_count >= n * 0.7,
+                               bullish_count >= n * 0.6, bearish_count >= n * 0.6, recent_bullish]
+        momentum = np.select(momentum_conditions, [
+            MOMENTUM_NAMES.index(name)
+            for name in ('Strong Bullish', 'Strong Bearish', 'Bullish', 'Bearish', 'Recent Bullish')
+        ], MOMENTUM_NAMES.index('Recent Bearish'))
+        strength += np.select(momentum_conditions[:4], [20, 20, 15, 15], 12)
+        
+        # Trend (analyze_trend); the last third is positions[-n//3:], as there
+        positions = y + heights // 2
+        diff = positions[:, (-n) // 3:].mean(axis=1) - positions[:, :n // 3].mean(axis=1)
+        downtrend = diff > self.px(8)
+        uptrend = diff < -self.px(8)
+        trend = np.select([downtrend, uptrend], [TREND_NAMES.index('Downtrend'), TREND_NAMES.index('Uptrend')],
+                          TREND_NAMES.index('Sideways'))
+        strength += np.where(downtrend | uptrend, 15, 10)
+        
+        # Support/resistance (analyze_support_resistance)
+        if n >= 4:
+            distances = np.abs(positions[:, :-1, None] - positions[:, None, :])
+            touches = np.count_nonzero(distances < self.px(10), axis=2)
+            key_level = (touches >= 3).any(axis=1)
+            level = np.where(key_level, LEVEL_NAMES.index('Key Level Touch'), LEVEL_NAMES.index('Minor Level'))
+            strength += np.where(key_level, 15, 5)
+        else:
+            level = LEVEL_NAMES.index('None')
+        
+        # Quality bonus (calculate_quality_bonus)
+        avg_height = heights.mean(axis=1)
+        strength += np.select([avg_height > self.px(20), avg_height > self.px(15)], [5, 3], 0)
+        
+        # Signal (determine_signal), on the unrounded confidence
+        confidence = np.minimum(strength / 80 * 100, 100)
+        bullish_pattern = np.isin(pattern, [PATTERN_NAMES.index('Bullish Engulfing'),
+                                            PATTERN_NAMES.index('Bullish Pin Bar')])
+        bearish_pattern = np.isin(pattern, [PATTERN_NAMES.index('Bearish Engulfing'),
+                                            PATTERN_NAMES.index('Bearish Pin Bar')])
+        momentum_bullish = np.isin(momentum, [MOMENTUM_NAMES.index(name) for name in MOMENTUM_NAMES
+                                              if 'Bullish' in name])
+        momentum_bearish = np.isin(momentum, [MOMENTUM_NAMES.index(name) for name in MOMENTUM_NAMES
+                                              if 'Bearish' in name])
+        call, put = SIGNAL_NAMES.index('CALL'), SIGNAL_NAMES.index('PUT')
+        last_direction = np.where(last_bullish, call, put)
+        out['signal'] = np.select([
+            confidence < 45,
+            bullish_pattern, bearish_pattern,
+            (confidence >= 60) & momentum_bullish, (confidence >= 60) & momentum_bearish,
+            confidence >= 55,
+        ], [SIGNAL_NAMES.index('NO SIGNAL'), call, put, call, put, last_direction],
+            SIGNAL_NAMES.index('NO SIGNAL'))
+        out['confidence'] = np.round(confidence, 1)
+        out['signal_strength'] = strength
+        out['pattern'] = pattern
+        out['momentum'] = momentum
+        out['trend'] = trend
+        out['support_resistance'] = level
+    
+    
+    
+    def create_debug_overlay(self, image, candles, prediction):
+        """Create debug overlay image with analysis"""
+        debug_img = image.copy()
+        
+        # Draw detected candles
+        for i, candle in enumerate(candles):
+            color = (0, 255, 0) if candle['type'] == 'bullish' else (0, 0, 255)
+            if candle['high'] >= 0:
+                cv2.line(debug_img, (candle['center_x'], candle['high']),
+                         (candle['center_x'], candle['low']), color, 1)
+            cv2.rectangle(debug_img, 
+                         (candle['x'], candle['y']), 
+                         (candle['x'] + candle['width'], candle['y'] + candle['height']), 
+                         color, 2)
+            
+            # Add candle number
+            cv2.putText(debug_img, str(i+1), 
+                       (candle['x'], candle['y']-5), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        
+        # Add prediction text
+        signal_color = (0, 255, 255) if prediction['signal'] == 'CALL' else (255, 0, 255)
+        if prediction['signal'] == 'NO SIGNAL':
+            signal_color = (128, 128, 128)
+            
+        cv2.putText(debug_img, f"Signal: {prediction['signal']}", 
+                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, signal_color, 2)
+        cv2.putText(debug_img, f"Confidence: {prediction['confidence']}%", 
+                   (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        
+        return debug_img
+
+class StreamSession:
+    """Live-frame analysis state: the previous frame, tracked candles and latest prediction
+    
+    Each pushed frame is diffed against the previous one and only the columns
+    from the leftmost change to the right edge are re-detected. Candles left
+    of that region are carried over, and the prediction is only re-scored
+    when the scored candle window actually changed. Frames are tracked at the
+    analyzer's working resolution, like single analyses; region_x in the
+    result is in the pushed frame's pixels.
+    """
+    
+    # Per-channel difference below which a pixel counts as unchanged
+    CHANGE_THRESHOLD = 24
+    # Extra columns re-detected left of the first change
+    REGION_MARGIN = 16
+    
+    def __init__(self, session_id, ai):
+        self.id = session_id
+        self.ai = ai
+        self.frame = None
+        self.candles = CandleSet()
+        self.prediction = None
+        self.region = None
+        self.version = 0
+        self.frames = 0
+        self.full_scans = 0
+        self._changed = threading.Condition()
+    
+    def push(self, image):
+        """Analyze the next frame and return the current prediction"""
+        start = time.perf_counter()
+        image, factor = self.ai.normalize(image)
+        if factor != 1.0:
+            # normalize reuses a per-thread buffer; this frame is kept for the next diff
+            image = image.copy()
+        with self._changed:
+            if self.frame is None or self.frame.shape != image.shape:
+                region_x = 0
+            else:
+                region_x = self._changed_from(image)
+            
+            if region_x is None:
+                # Identical frame: nothing to re-detect or re-score
+                candles = self.candles
+            elif region_x == 0:
+                self.region = self.ai.chart_region(image)
+                x, y, w, h = self.region
+                candles = self.ai.detect_region(image[y:y + h, x:x + w], image.shape[0]).shifted(x, y)
+                self.full_scans += 1
+            else:
+                region_x = self._region_start(region_x)
+                candles = self._redetect(image, region_x)
+            
+            window = candles[-6:]
+            if self.prediction is None or not np.array_equal(window.data, self.candles[-6:].data):
+                self.prediction = self.ai.generate_prediction(candles, image)
+                self.version += 1
+                self._changed.notify_all()
+            
+            self.frame = image
+            self.candles = candles
+            self.frames += 1
+            
+            result = dict(self.prediction)
+            result['stream'] = {
+                "session_id": self.id,
+                "frame": self.frames,
+                "version": self.version,
+                "region_x": region_x if region_x is None else int(round(region_x * factor)),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+            return result
+    
+    def _changed_from(self, image):
+        """Leftmost column that differs from the previous frame, or None if none does"""
+        diff = cv2.absdiff(self.frame, image, dst=self.ai.buffers.get('diff', image.shape))
+        # Row-wise maximum over the (height, width * 3) view, then per pixel column
+        column_max = diff.reshape(diff.shape[0], -1).max(axis=0)
+        changed = np.flatnonzero(column_max.reshape(-1, 3).max(axis=1) > self.CHANGE_THRESHOLD)
+        return int(changed[0]) if changed.size else None
+    
+    def _region_start(self, x):
+        """Move the region start left so it does not cut through a tracked candle"""
+        x = max(x - self.REGION_MARGIN, 0)
+        lefts = self.candles['x'].tolist()
+        rights = (self.candles['x'] + self.candles['width']).tolist()
+        # Walk right to left so a shifted start is checked against earlier candles too
+        for left, right in zip(reversed(lefts), reversed(rights)):
+            if left - self.REGION_MARGIN <= x <= right:
+                x = max(left - self.REGION_MARGIN, 0)
+        return x
+    
+    def _redetect(self, image, region_x):
+        """Re-detect candles right of region_x and merge them with the carried-over ones"""
+        x, y, w, h = self.region
+        start = max(region_x, x)
+        fresh = self.ai.detect_region(image[y:y + h, start:x + w], image.shape[0])
+        if start > x:
+            # Candles touching the cut may be clipped; the margin keeps real ones clear of it
+            fresh = fresh[fresh['x'] > 0]
+        fresh = fresh.shifted(start, y)
+        
+        kept = self.candles[self.candles['x'] + self.candles['width'] < region_x]
+        merged = CandleSet(np.concatenate([kept.data, fresh.data])).sorted()
+        return self.ai.recent(merged)
+    
+    def wait(self, version, timeout=None):
+        """Block until the prediction moves past version; returns the new version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > version, timeout)
+            return self.version
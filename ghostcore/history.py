@@ -0,0 +1,232 @@
+"""Append-only binary history of predictions, candles and outcomes"""
+import os
+import threading
+import time
+
+from .lazy import LazyModule
+
+np = LazyModule('numpy', 'np', globals())
+
+# Code tables for the fixed-width history records; 255 marks a value not listed
+SIGNAL_NAMES = ('NO SIGNAL', 'CALL', 'PUT')
+PATTERN_NAMES = (
+    'None', 'Standard Candle', 'Doji',
+    'Bullish Engulfing', 'Bearish Engulfing', 'Bullish Pin Bar', 'Bearish Pin Bar',
+    'Bullish Momentum', 'Bearish Momentum', 'Large Bullish Candle', 'Large Bearish Candle',
+)
+TREND_NAMES = ('Unknown', 'Limited Data', 'Neutral', 'Sideways', 'Uptrend', 'Downtrend',
+               'Strong Uptrend', 'Strong Downtrend')
+MOMENTUM_NAMES = ('Neutral', 'Limited Data', 'Bullish', 'Bearish', 'Strong Bullish', 'Strong Bearish',
+                  'Recent Bullish', 'Recent Bearish', 'Bullish Shift', 'Bearish Shift')
+LEVEL_NAMES = ('None', 'Minor Level', 'Key Level Touch')
+UNKNOWN_CODE = 255
+
+PREDICTION_RECORD_FIELDS = [
+    ('timestamp', '<f8'), ('confidence', '<f4'), ('signal_strength', '<f4'),
+    ('signal', 'u1'), ('pattern', 'u1'), ('trend', 'u1'), ('momentum', 'u1'),
+    ('support_resistance', 'u1'), ('candle_count', 'u1'), ('image_width', '<u2'),
+    ('image_height', '<u2'), ('reserved', '<u2'),
+]  # 28 bytes
+CANDLE_RECORD_FIELDS = [
+    ('record_id', '<u4'), ('x', '<i4'), ('y', '<i4'), ('width', '<i4'), ('height', '<i4'),
+    ('area', '<f4'), ('body_ratio', '<f4'), ('aspect_ratio', '<f4'), ('type', 'i1'), ('reserved', '3u1'),
+]  # 36 bytes
+OUTCOME_RECORD_FIELDS = [('record_id', '<u4'), ('outcome', 'u1'), ('reserved', '3u1')]
+OUTCOME_CODES = {'win': 1, 'loss': 2}
+
+def _code(names, value):
+    try:
+        return names.index(value)
+    except ValueError:
+        return UNKNOWN_CODE
+
+class HistoryStore:
+    """Append-only binary log of predictions, their candles and later outcomes
+    
+    Records are fixed width and only ever appended, so the files can be
+    memory-mapped and scanned as NumPy views. A prediction's record id is its
+    index in predictions.bin. Queries run as vectorized masks over those
+    views and never build per-record Python objects.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.paths = {
+            'predictions': os.path.join(directory, 'predictions.bin'),
+            'candles': os.path.join(directory, 'candles.bin'),
+            'outcomes': os.path.join(directory, 'outcomes.bin'),
+        }
+        self._lock = threading.Lock()
+        self._fds = {}
+    
+    def _fd(self, name):
+        fd = self._fds.get(name)
+        if fd is None:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = self._fds[name] = os.open(self.paths[name], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return fd
+    
+    def append(self, prediction, candles=None, image_shape=None, timestamp=None):
+        """Log one prediction (and its candles); returns the record id"""
+        record = np.zeros(1, dtype=PREDICTION_RECORD_FIELDS)
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        record['confidence'] = prediction.get('confidence', 0)
+        record['signal_strength'] = prediction.get('signal_strength', 0)
+        record['signal'] = _code(SIGNAL_NAMES, prediction.get('signal'))
+        record['pattern'] = _code(PATTERN_NAMES, prediction.get('pattern', 'None'))
+        record['trend'] = _code(TREND_NAMES, prediction.get('trend', 'Unknown'))
+        record['momentum'] = _code(MOMENTUM_NAMES, prediction.get('momentum', 'Neutral'))
+        record['support_resistance'] = _code(LEVEL_NAMES, prediction.get('support_resistance', 'None'))
+        record['candle_count'] = min(prediction.get('candle_count', len(candles) if candles is not None else 0), 255)
+        if image_shape is not None:
+            record['image_height'] = min(image_shape[0], 65535)
+            record['image_width'] = min(image_shape[1], 65535)
+        
+        with self._lock:
+            fd = self._fd('predictions')
+            _lock_file(fd)
+            try:
+                # The record id is the position this append lands at
+                record_id = os.fstat(fd).st_size // record.itemsize
+                os.write(fd, record.tobytes())
+                if candles is not None and len(candles):
+                    rows = np.zeros(len(candles), dtype=CANDLE_RECORD_FIELDS)
+                    rows['record_id'] = record_id
+                    for name in ('x', 'y', 'width', 'height', 'area', 'body_ratio', 'aspect_ratio', 'type'):
+                        rows[name] = candles[name]
+                    os.write(self._fd('candles'), rows.tobytes())
+            finally:
+                _unlock_file(fd)
+        return record_id
+    
+    def record_outcome(self, record_id, outcome):
+        """Append the outcome ('win' or 'loss') of an earlier prediction; the latest entry wins"""
+        if outcome not in OUTCOME_CODES:
+            raise ValueError(f"Unknown outcome: {outcome}")
+        if not 0 <= record_id < len(self.view('predictions', PREDICTION_RECORD_FIELDS)):
+            raise ValueError(f"Unknown record: {record_id}")
+        row = np.zeros(1, dtype=OUTCOME_RECORD_FIELDS)
+        row['record_id'] = record_id
+        row['outcome'] = OUTCOME_CODES[outcome]
+        with self._lock:
+            os.write(self._fd('outcomes'), row.tobytes())
+    
+    def view(self, name, fields):
+        """Read-only memory-mapped view of a log (whole records only)"""
+        dtype = np.dtype(fields)
+        path = self.paths[name]
+        try:
+            count = os.path.getsize(path) // dtype.itemsize
+        except OSError:
+            count = 0
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+    
+    def outcomes(self, count):
+        """Outcome code per prediction record (0 when none was reported)"""
+        result = np.zeros(count, dtype=np.uint8)
+        rows = self.view('outcomes', OUTCOME_RECORD_FIELDS)
+        if len(rows):
+            ids = np.asarray(rows['record_id'])
+            valid = ids < count
+            # Fancy assignment keeps the last write for repeated ids
+            result[ids[valid]] = rows['outcome'][valid]
+        return result
+    
+    def query(self, start=None, end=None, pattern=None, signal=None, limit=0):
+        """Summarize predictions in [start, end) (unix seconds) matching pattern/signal
+        
+        Returns counts per signal and pattern, per-pattern win rates from
+        reported outcomes, a confidence histogram per hour of day (UTC+6) and
+        up to limit (when positive) of the most recent matching records.
+        """
+        records = self.view('predictions', PREDICTION_RECORD_FIELDS)
+        mask = np.ones(len(records), dtype=bool)
+        if start is not None or end is not None:
+            timestamps = records['timestamp']
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps < end
+        if pattern is not None:
+            mask &= records['pattern'] == _code(PATTERN_NAMES, pattern)
+        if signal is not None:
+            mask &= records['signal'] == _code(SIGNAL_NAMES, signal)
+        
+        ids = np.flatnonzero(mask)
+        selected = records[ids]
+        outcomes = self.outcomes(len(records))[ids]
+        
+        def counts(codes, names):
+            tally = np.bincount(codes, minlength=256)
+            return {(names[i] if i < len(names) else 'Other'): int(tally[i]) for i in np.flatnonzero(tally)}
+        
+        patterns = {}
+        pattern_codes = selected['pattern']
+        for code in np.unique(pattern_codes):
+            in_pattern = pattern_codes == code
+            wins = int(np.count_nonzero(outcomes[in_pattern] == OUTCOME_CODES['win']))
+            losses = int(np.count_nonzero(outcomes[in_pattern] == OUTCOME_CODES['loss']))
+            name = PATTERN_NAMES[code] if code < len(PATTERN_NAMES) else 'Other'
+            patterns[name] = {
+                "count": int(np.count_nonzero(in_pattern)),
+                "mean_confidence": round(float(selected['confidence'][in_pattern].mean()), 2),
+                "wins": wins,
+                "losses": losses,
+                "win_rate": round(wins / (wins + losses), 4) if wins + losses else None,
+            }
+        
+        # Confidence distribution per local hour, in 10-point bins
+        hours = ((selected['timestamp'] + 6 * 3600) // 3600 % 24).astype(np.int64)
+        bins = np.minimum(selected['confidence'] // 10, 9).astype(np.int64)
+        grid = np.bincount(hours * 10 + bins, minlength=240).reshape(24, 10)
+        confidence_by_hour = {f"{hour:02d}": grid[hour].tolist() for hour in np.flatnonzero(grid.sum(axis=1))}
+        
+        summary = {
+            "total_records": len(records),
+            "matched": len(ids),
+            "signals": counts(selected['signal'], SIGNAL_NAMES),
+            "patterns": patterns,
+            "confidence_by_hour": confidence_by_hour,
+            "mean_confidence": round(float(selected['confidence'].mean()), 2) if len(ids) else None,
+        }
+        if limit > 0:
+            summary["records"] = [self._record_dict(int(i), records[i]) for i in ids[-limit:][::-1]]
+        return summary
+    
+    def _record_dict(self, record_id, row):
+        def name(names, code):
+            return names[code] if code < len(names) else 'Other'
+        return {
+            "record_id": record_id,
+            "timestamp": float(row['timestamp']),
+            "signal": name(SIGNAL_NAMES, row['signal']),
+            "confidence": round(float(row['confidence']), 1),
+            "pattern": name(PATTERN_NAMES, row['pattern']),
+            "trend": name(TREND_NAMES, row['trend']),
+            "momentum": name(MOMENTUM_NAMES, row['momentum']),
+            "support_resistance": name(LEVEL_NAMES, row['support_resistance']),
+            "candle_count": int(row['candle_count']),
+        }
+    
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+try:
+    import fcntl
+    
+    def _lock_file(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    
+    def _unlock_file(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+except ImportError:  # Windows: appends are only serialized within this process
+    def _lock_file(fd):
+        pass
+    
+    def _unlock_file(fd):
+        pass
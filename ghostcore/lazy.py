@@ -0,0 +1,19 @@
+"""Module proxies that defer heavy imports until first use"""
+import importlib
+
+class LazyModule:
+    """Stand-in for a heavy module that imports it on first attribute access
+    
+    Once loaded, the module replaces the proxy in the owning module's globals
+    (namespace) so later lookups cost nothing extra.
+    """
+    
+    def __init__(self, name, alias, namespace):
+        self._name = name
+        self._alias = alias
+        self._namespace = namespace
+    
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        self._namespace[self._alias] = module
+        return getattr(module, attr)
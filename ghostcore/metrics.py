@@ -0,0 +1,209 @@
+"""Stage latency histograms and counters in the Prometheus text format"""
+import threading
+import time
+from bisect import bisect_left
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus cumulative-bucket model"""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+    
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def samples(self):
+        """(le, cumulative count) pairs including +Inf"""
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else repr(bound)), total
+
+class _StageTimer:
+    """Context manager timing one pipeline stage"""
+    __slots__ = ('metrics', 'name', 'start')
+    
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe_stage(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.error(self.name)
+        return False
+
+class PipelineMetrics:
+    """Stage latency histograms and pipeline counters, exportable in Prometheus format
+    
+    Stage timers cost a couple of perf_counter calls and an uncontended lock,
+    so they stay on permanently. Timings for a single analysis can also be
+    collected per thread with collect().
+    """
+    
+    STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    MEGAPIXEL_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32)
+    COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 16, 32, 64, 128, 256, 1024, 4096)
+    # Stages a frame still goes through when triage rejects it (or that are
+    # not part of an analysis); every other stage counts as skipped work
+    TRIAGE_UNSKIPPED = ('upload', 'decode', 'triage', 'overlay', 'encode')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stages = {}
+        self.errors = {}
+        self.analyses = 0
+        self.rejections = {}
+        self.image_megapixels = Histogram(self.MEGAPIXEL_BUCKETS)
+        self.image_width = 0
+        self.image_height = 0
+        self.candles_detected = Histogram(self.COUNT_BUCKETS)
+        self.contours_found = Histogram(self.COUNT_BUCKETS)
+    
+    def stage(self, name):
+        """Time a block: with metrics.stage('blur'): ..."""
+        return _StageTimer(self, name)
+    
+    def observe_stage(self, name, seconds):
+        with self._lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = Histogram(self.STAGE_BUCKETS)
+            histogram.observe(seconds)
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds * 1000
+    
+    def error(self, stage):
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+    
+    def reject(self, reason):
+        """Count a frame rejected by triage before detection"""
+        with self._lock:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+    
+    def triage_saved_seconds(self):
+        """Estimated pipeline seconds not spent on rejected frames
+        
+        Each rejection is credited with the mean time accepted frames spent
+        in the stages triage skips.
+        """
+        with self._lock:
+            rejected = sum(self.rejections.values())
+            accepted = self.analyses - rejected
+            if not rejected or accepted <= 0:
+                return 0.0
+            skipped = sum(hist.sum for name, hist in self.stages.items() if name not in self.TRIAGE_UNSKIPPED)
+            return rejected * skipped / accepted
+    
+    def observe_image(self, image):
+        height, width = image.shape[:2]
+        with self._lock:
+            self.analyses += 1
+            self.image_width = width
+            self.image_height = height
+            self.image_megapixels.observe(width * height / 1e6)
+    
+    def observe_candles(self, contours, candles):
+        with self._lock:
+            self.contours_found.observe(contours)
+            self.candles_detected.observe(candles)
+        detections = getattr(self._local, 'detections', None)
+        if detections is not None:
+            detections.append((contours, candles))
+    
+    def collect(self):
+        """Context manager gathering this thread's stage timings (ms) into a dict"""
+        return _TimingCollector(self._local)
+    
+    def record_detections(self):
+        """Context manager listing this thread's (contours, candles) counts per detection"""
+        return _DetectionRecorder(self._local)
+    
+    def render_prometheus(self, extra=None):
+        """Text exposition format; extra maps metric name -> (type, help, {labels: value})"""
+        lines = []
+        
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                prefix = f"{labels}," if labels else ""
+                for le, total in hist.samples():
+                    lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {total}')
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {hist.sum}")
+                lines.append(f"{name}_count{suffix} {hist.count}")
+        
+        def simple(name, kind, help_text, values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        
+        saved = self.triage_saved_seconds()
+        with self._lock:
+            histogram('ghostcore_stage_seconds', 'Latency of analysis pipeline stages',
+                      [(f'stage="{name}"', hist) for name, hist in sorted(self.stages.items())])
+            histogram('ghostcore_image_megapixels', 'Size of analyzed frames', [('', self.image_megapixels)])
+            histogram('ghostcore_contours_found', 'Colour contours found per detection', [('', self.contours_found)])
+            histogram('ghostcore_candles_detected', 'Valid candles per detection', [('', self.candles_detected)])
+            simple('ghostcore_analyses_total', 'counter', 'Frames analyzed', [('', self.analyses)])
+            simple('ghostcore_errors_total', 'counter', 'Failures by pipeline stage',
+                   [(f'stage="{name}"', count) for name, count in sorted(self.errors.items())])
+            simple('ghostcore_triage_rejected_total', 'counter', 'Frames rejected as non-charts by reason',
+                   [(f'reason="{reason}"', count) for reason, count in sorted(self.rejections.items())])
+            simple('ghostcore_triage_saved_seconds_total', 'counter',
+                   'Estimated pipeline seconds saved by triage rejections', [('', round(saved, 6))])
+            simple('ghostcore_last_image_pixels', 'gauge', 'Dimensions of the most recent frame',
+                   [('dimension="width"', self.image_width), ('dimension="height"', self.image_height)])
+        
+        for name, (kind, help_text, values) in (extra or {}).items():
+            simple(name, kind, help_text, sorted(values.items()))
+        return "\n".join(lines) + "\n"
+
+class _TimingCollector:
+    """Installs a per-thread timings dict for the duration of a with block"""
+    __slots__ = ('local', 'timings', 'previous')
+    
+    def __init__(self, local):
+        self.local = local
+    
+    def __enter__(self):
+        self.previous = getattr(self.local, 'timings', None)
+        self.timings = self.local.timings = {}
+        return self.timings
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.local.timings = self.previous
+        for name, value in self.timings.items():
+            self.timings[name] = round(value, 3)
+        return False
+
+class _DetectionRecorder:
+    """Installs a per-thread list of detection counts for the duration of a with block"""
+    __slots__ = ('local', 'previous')
+    
+    def __init__(self, local):
+        self.local = local
+    
+    def __enter__(self):
+        self.previous = getattr(self.local, 'detections', None)
+        detections = self.local.detections = []
+        return detections
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.local.detections = self.previous
+        return False
@@ -0,0 +1,77 @@
+"""Bounded on-disk ring buffer of per-analysis profiles"""
+import json
+import os
+import threading
+import uuid
+
+class ProfileStore:
+    """Keeps the newest max_profiles cProfile captures in a directory
+    
+    Each capture is <id>.prof, a pstats file (pstats.Stats, snakeviz,
+    gprof2dot), next to <id>.json with its metadata: capture time, upload
+    hash, frame size, contour and candle counts, stage timings and the
+    outcome. The oldest capture is deleted as each new one beyond the limit
+    arrives. Captures already in the directory are picked up on first use,
+    so the ring survives restarts.
+    """
+    
+    def __init__(self, directory, max_profiles=32):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._entries = None  # Metadata, oldest first
+    
+    def _index(self):
+        if self._entries is None:
+            entries = []
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if not name.endswith('.json'):
+                        continue
+                    try:
+                        with open(os.path.join(self.directory, name)) as f:
+                            entries.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue  # Half-written or foreign file
+            entries.sort(key=lambda entry: entry.get('captured_at', 0))
+            self._entries = entries
+        return self._entries
+    
+    def save(self, profiler, metadata):
+        """Write profiler's stats and metadata as a new capture; returns its id"""
+        profile_id = uuid.uuid4().hex
+        entry = dict(metadata, profile_id=profile_id)
+        with self._lock:
+            entries = self._index()
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(self._path(profile_id, '.prof'))
+            # Metadata last: a capture is listed only once its profile is complete
+            with open(self._path(profile_id, '.json'), 'w') as f:
+                json.dump(entry, f)
+            entries.append(entry)
+            while len(entries) > self.max_profiles:
+                self._remove(entries.pop(0)['profile_id'])
+        return profile_id
+    
+    def _remove(self, profile_id):
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(self._path(profile_id, suffix))
+            except FileNotFoundError:
+                pass
+    
+    def _path(self, profile_id, suffix):
+        return os.path.join(self.directory, profile_id + suffix)
+    
+    def list(self):
+        """Metadata of every stored capture, newest first"""
+        with self._lock:
+            return [dict(entry) for entry in reversed(self._index())]
+    
+    def path(self, profile_id):
+        """Filesystem path of a stored capture's pstats file, or None for unknown ids"""
+        with self._lock:
+            # Only ids from the index are turned into paths, never raw request input
+            if any(entry['profile_id'] == profile_id for entry in self._index()):
+                return self._path(profile_id, '.prof')
+        return None
@@ -0,0 +1,148 @@
+"""Chart plotting-area and multi-panel layout detection"""
+from .cache import ResultCache
+from .lazy import LazyModule
+
+cv2 = LazyModule('cv2', 'cv2', globals())
+np = LazyModule('numpy', 'np', globals())
+
+class ChartRegionDetector:
+    """Locates the chart plotting area and caches it per screen layout
+    
+    The plotting area is taken to be the largest connected region of the
+    dominant background colour once candles and grid lines are closed over,
+    found on a small thumbnail. The result is cached under a layout
+    fingerprint (resolution plus a coarse signature of the frame borders, where
+    toolbars and panels live), so later screenshots of the same layout skip
+    the search.
+    """
+    
+    SAMPLE_SIZE = 320  # Longest side of the search thumbnail
+    SIGNATURE_SIZE = 64  # Thumbnail used for the layout fingerprint
+    SIGNATURE_BAND = 4  # Border rows/columns of that thumbnail in the fingerprint
+    BACKGROUND_TOLERANCE = 12  # Grey levels around the dominant background
+    MIN_AREA = 0.2  # Smaller regions are not trusted; the full frame is used
+    PADDING = 4  # Pixels added around the detected region
+    # Panel splitting
+    SEPARATOR_MIN_WIDTH = 2  # Thinner uniform lines (grid lines) do not split panels
+    SEPARATOR_TOLERANCE = 8  # Grey-level spread allowed along a divider
+    PANEL_MIN_FRACTION = 0.25  # Each side of a split keeps at least this share of the region
+    PANEL_MAX_DEPTH = 2  # Nested splits, so at most 4 panels
+    
+    def __init__(self, cache_size=64):
+        self.cache = ResultCache(cache_size)
+    
+    def region(self, image):
+        """(x, y, width, height) of the plotting area, from cache when the layout is known"""
+        key = self.fingerprint(image)
+        region = self.cache.get(key)
+        if region is None:
+            region = self.detect(image)
+            self.cache.put(key, region)
+        return region
+    
+    def fingerprint(self, image):
+        """Layout key: frame size and quantized border bands of a tiny thumbnail"""
+        size, band = self.SIGNATURE_SIZE, self.SIGNATURE_BAND
+        # Strided subsample first: area-averaging a full frame costs milliseconds
+        step = max(min(image.shape[:2]) // (size * 4), 1)
+        small = cv2.resize(image[::step, ::step], (size, size), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) >> 5
+        signature = np.concatenate([
+            gray[:band].ravel(), gray[-band:].ravel(),
+            gray[:, :band].ravel(), gray[:, -band:].ravel(),
+        ])
+        return image.shape[:2] + (signature.tobytes(),)
+    
+    def detect(self, image):
+        """Search for the plotting area without using the cache"""
+        height, width = image.shape[:2]
+        scale = min(self.SAMPLE_SIZE / max(height, width), 1.0)
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        
+        # Dominant background level from a coarse histogram
+        histogram = np.bincount((gray >> 3).ravel(), minlength=32)
+        level = int(np.argmax(histogram)) * 8 + 4
+        background = cv2.inRange(gray, max(level - self.BACKGROUND_TOLERANCE, 0),
+                                 min(level + self.BACKGROUND_TOLERANCE, 255))
+        
+        # Close over candles, wicks and grid lines so the plot is one component
+        k = max(3, int(max(gray.shape) * 0.04))
+        background = cv2.morphologyEx(background, cv2.MORPH_CLOSE, np.ones((k, k), np.uint8))
+        
+        count, _, stats, _ = cv2.connectedComponentsWithStats(background, connectivity=4)
+        if count < 2:
+            return (0, 0, width, height)
+        largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        x, y, w, h = (int(v) for v in stats[largest, :4])
+        if w * h < self.MIN_AREA * gray.shape[0] * gray.shape[1]:
+            return (0, 0, width, height)
+        
+        # Back to full resolution with a little padding
+        x0 = max(int(x / scale) - self.PADDING, 0)
+        y0 = max(int(y / scale) - self.PADDING, 0)
+        x1 = min(int(np.ceil((x + w) / scale)) + self.PADDING, width)
+        y1 = min(int(np.ceil((y + h) / scale)) + self.PADDING, height)
+        return (x0, y0, x1 - x0, y1 - y0)
+    
+    def panels(self, image):
+        """[(x, y, width, height)] of the chart panels, from cache when the layout is known"""
+        key = ('panels',) + self.fingerprint(image)
+        panels = self.cache.get(key)
+        if panels is None:
+            panels = self.detect_panels(image)
+            self.cache.put(key, panels)
+        return panels
+    
+    def detect_panels(self, image):
+        """Split a multi-chart screenshot at its divider lines (recursive XY cut)
+        
+        A divider is a run of at least SEPARATOR_MIN_WIDTH rows or columns that
+        are one colour along the whole region and differ from the dominant
+        background. The run nearest the middle is cut first and both sides are
+        split again, up to PANEL_MAX_DEPTH levels. A frame without dividers
+        is one panel. Panels are returned in reading order.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        histogram = np.bincount((gray[::4, ::4] >> 3).ravel(), minlength=32)
+        level = int(np.argmax(histogram)) * 8 + 4
+        panels = []
+        self._split(gray, level, (0, 0, gray.shape[1], gray.shape[0]), self.PANEL_MAX_DEPTH, panels)
+        # Reading order: top to bottom, then left to right
+        return sorted(panels, key=lambda panel: (panel[1], panel[0]))
+    
+    def _split(self, gray, level, region, depth, panels):
+        x, y, w, h = region
+        cut = self._divider(gray[y:y + h, x:x + w], level) if depth > 0 else None
+        if cut is None:
+            panels.append(region)
+            return
+        axis, start, stop = cut
+        if axis == 1:
+            first, second = (x, y, start, h), (x + stop, y, w - stop, h)
+        else:
+            first, second = (x, y, w, start), (x, y + stop, w, h - stop)
+        self._split(gray, level, first, depth - 1, panels)
+        self._split(gray, level, second, depth - 1, panels)
+    
+    def _divider(self, gray, level):
+        """(axis, start, stop) of the divider run nearest the middle, or None
+        
+        axis 1 is a vertical divider (columns start:stop), 0 a horizontal one.
+        """
+        best = None
+        for axis in (1, 0):
+            # Extent of each column (axis 1) or row (axis 0) along the region
+            low = gray.min(axis=1 - axis).astype(np.int16)
+            high = gray.max(axis=1 - axis).astype(np.int16)
+            uniform = (high - low <= self.SEPARATOR_TOLERANCE) & (np.abs(low - level) > self.BACKGROUND_TOLERANCE)
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], uniform.view(np.int8), [0]])))
+            length = len(uniform)
+            for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                if (stop - start < self.SEPARATOR_MIN_WIDTH or
+                        min(start, length - stop) < self.PANEL_MIN_FRACTION * length):
+                    continue
+                offset = abs((start + stop) / 2 / length - 0.5)
+                if best is None or offset < best[0]:
+                    best = (offset, axis, start, stop)
+        return best[1:] if best is not None else None
@@ -0,0 +1,177 @@
+"""Earliest-deadline-first scheduling for analyses that go stale"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+class QueueFullError(RuntimeError):
+    """Raised when the scheduler has no free slot"""
+
+class DeadlineExceeded(RuntimeError):
+    """Set on a job dropped because it could no longer finish before its deadline"""
+
+class DeadlineScheduler:
+    """Worker threads that always run the pending job with the earliest deadline
+    
+    Deadlines are Unix timestamps. A job that cannot finish in time even on
+    its fast path is dropped (its future raises DeadlineExceeded): at submit
+    when the jobs due before it would already use up its time, or when a
+    worker picks it. One that can only make it on the fast path, or that is
+    picked while degrade_depth or more jobs are waiting, runs its fallback
+    instead. Run times are moving averages of recent jobs of the same kind
+    (single analyses, panel screenshots, batches, ...), since a batch and a
+    cache hit have nothing to say about each other's cost. At most workers +
+    queue_depth jobs are accepted; submit() raises QueueFullError beyond that.
+    OpenCV releases the GIL, so worker threads analyze frames in parallel.
+    """
+    # Weight of the newest run in the moving run-time estimates
+    ESTIMATE_WEIGHT = 0.2
+    
+    def __init__(self, workers, queue_depth, default_budget=30, degrade_depth=None,
+                 thread_name_prefix='ghostcore-analysis'):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.default_budget = default_budget
+        self.degrade_depth = degrade_depth
+        self.thread_name_prefix = thread_name_prefix
+        self._heap = []
+        self._order = itertools.count()
+        self._ready = threading.Condition()
+        self._threads = []
+        self._closed = False
+        # Job kind -> seconds per job on each path, learned from completed jobs
+        self.estimates = {}
+        self.in_flight = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.degraded = 0
+        self.on_time = 0
+        self.late = 0
+        self.failed = 0
+    
+    def submit(self, fn, *args, deadline=None, fallback=None, kind='analysis', **kwargs):
+        """Queue fn(*args, **kwargs) to finish by deadline; fallback() is the fast path
+        
+        Without a deadline the job gets default_budget seconds from now. kind
+        names the sort of job whose run times it is estimated from.
+        """
+        future = Future()
+        if deadline is None:
+            deadline = time.time() + self.default_budget
+        with self._ready:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            # Jobs due earlier run first, so they delay this one
+            ahead = sum(self._expected(job[3], job[2]) for due, _, job in self._heap if due <= deadline)
+            wait = ahead / self.workers
+            if time.time() + wait + self._expected(kind, fallback) >= deadline:
+                self.dropped += 1
+                future.set_exception(DeadlineExceeded("Deadline passes before the analysis could run"))
+                return future
+            if self.in_flight >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise QueueFullError("Analysis queue is full")
+            self.in_flight += 1
+            job = (future, lambda: fn(*args, **kwargs), fallback, kind)
+            heapq.heappush(self._heap, (deadline, next(self._order), job))
+            if len(self._threads) < self.workers:
+                # Threads start with the first jobs, not at import
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f"{self.thread_name_prefix}-{len(self._threads)}")
+                self._threads.append(thread)
+                thread.start()
+            self._ready.notify()
+        return future
+    
+    def _expected(self, kind, fallback):
+        # Seconds a job should take: its fast path when it has one that has run before
+        estimate = self.estimates.get(kind, {})
+        if fallback is not None and estimate.get('fast'):
+            return estimate['fast']
+        return estimate.get('full', 0.0)
+    
+    def _work(self):
+        while True:
+            with self._ready:
+                while not self._heap and not self._closed:
+                    self._ready.wait()
+                if not self._heap:
+                    return
+                deadline, _, (future, run, fallback, kind) = heapq.heappop(self._heap)
+                backlog = len(self._heap)
+                estimate = self.estimates.get(kind, {})
+                full_estimate = estimate.get('full', 0.0)
+                fast_estimate = estimate.get('fast', 0.0) if fallback is not None else full_estimate
+            
+            if not future.set_running_or_notify_cancel():
+                self._finish()
+                continue
+            
+            remaining = deadline - time.time()
+            if remaining <= 0 or remaining < fast_estimate:
+                self._finish(dropped=True)
+                future.set_exception(DeadlineExceeded("Deadline passed before the analysis could run"))
+                continue
+            mode = 'full'
+            if fallback is not None and (remaining < full_estimate or
+                                         (self.degrade_depth is not None and backlog >= self.degrade_depth)):
+                mode, run = 'fast', fallback
+            
+            start = time.perf_counter()
+            try:
+                result = run()
+            except BaseException as e:
+                self._finish(failed=True)
+                future.set_exception(e)
+                continue
+            self._finish(mode, time.perf_counter() - start, time.time() <= deadline, kind=kind)
+            future.set_result(result)
+    
+    def _finish(self, mode=None, elapsed=None, on_time=False, dropped=False, failed=False, kind=None):
+        with self._ready:
+            self.in_flight -= 1
+            self.dropped += dropped
+            self.failed += failed
+            if mode is None:
+                return
+            estimate = self.estimates.setdefault(kind, {'full': 0.0, 'fast': 0.0})
+            previous = estimate[mode]
+            estimate[mode] = elapsed if not previous else previous + (elapsed - previous) * self.ESTIMATE_WEIGHT
+            self.degraded += mode == 'fast'
+            if on_time:
+                self.on_time += 1
+            else:
+                self.late += 1
+    
+    def stats(self):
+        with self._ready:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "queued": len(self._heap),
+                "completed": self.on_time + self.late,
+                "rejected": self.rejected,
+                "dropped": self.dropped,
+                "degraded": self.degraded,
+                "on_time": self.on_time,
+                "late": self.late,
+                "failed": self.failed,
+                "estimate_ms": {kind: {mode: round(seconds * 1000, 2) for mode, seconds in estimate.items()}
+                                for kind, estimate in self.estimates.items()},
+            }
+    
+    def shutdown(self, wait=True):
+        """Stop the workers; jobs still queued are cancelled"""
+        with self._ready:
+            self._closed = True
+            pending, self._heap = self._heap, []
+            self.in_flight -= len(pending)
+            self._ready.notify_all()
+        for _, _, (future, _, _, _) in pending:
+            future.cancel()
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
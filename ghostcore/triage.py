@@ -0,0 +1,66 @@
+"""Cheap rejection of uploads that are not candlestick charts"""
+from .colors import classify_colors
+from .lazy import LazyModule
+
+np = LazyModule('numpy', 'np', globals())
+
+class ChartTriage:
+    """Decides from a thumbnail whether an image can be a candlestick chart
+    
+    The thumbnail is a strided subsample, so candle colours are never blended
+    with the background, classified with the same colour table as detection.
+    A chart has some green/red candle pixels but not a flood of them, and they
+    form separate vertical bars: runs of adjacent columns holding candle
+    colour that are narrow and at least as tall as they are wide. Screenshots
+    with too few such bars (photos, documents, blank or noisy frames) are
+    rejected before the full pipeline runs.
+    """
+    
+    SAMPLE_SIZE = 640  # Longest side of the thumbnail, at most
+    MIN_COLUMN_PIXELS = 2  # Candle pixels a column needs to count as part of a bar
+    MAX_BAR_WIDTH = 0.15  # Widest bar as a fraction of the thumbnail width
+    
+    # Rejection reasons
+    NO_CANDLE_COLOURS = 'no-candle-colours'
+    TOO_MUCH_COLOUR = 'too-much-candle-colour'
+    NO_BARS = 'no-vertical-bars'
+    
+    def __init__(self, min_color=0.002, max_color=0.35, min_bars=3):
+        # Bounds on the fraction of thumbnail pixels classified green or red
+        self.min_color = min_color
+        self.max_color = max_color
+        # Bar-shaped runs of candle colour required
+        self.min_bars = min_bars
+    
+    def check(self, image):
+        """None when image may be a chart, otherwise the rejection reason"""
+        height, width = image.shape[:2]
+        step = max(-(-max(height, width) // self.SAMPLE_SIZE), 1)
+        small = np.ascontiguousarray(image[::step, ::step])
+        masks = classify_colors(small)
+        candle = (masks[:, :, 0] | masks[:, :, 1]) > 0
+        
+        coverage = np.count_nonzero(candle) / candle.size
+        if coverage < self.min_color:
+            return self.NO_CANDLE_COLOURS
+        if coverage > self.max_color:
+            return self.TOO_MUCH_COLOUR
+        
+        if self.count_bars(candle) < self.min_bars:
+            return self.NO_BARS
+        return None
+    
+    def count_bars(self, candle):
+        """Narrow, upright runs of columns in a boolean candle-pixel mask"""
+        column_pixels = np.count_nonzero(candle, axis=0)
+        occupied = column_pixels >= self.MIN_COLUMN_PIXELS
+        # Run boundaries: starts where a column turns occupied, ends where it stops
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], occupied.view(np.int8), [0]))))
+        starts, ends = edges[::2], edges[1::2]
+        if not len(starts):
+            return 0
+        widths = ends - starts
+        # Tallest column of each run stands in for the bar height
+        heights = np.maximum.reduceat(column_pixels, starts)
+        max_width = max(self.MAX_BAR_WIDTH * candle.shape[1], 1)
+        return int(np.count_nonzero((widths <= max_width) & (heights >= widths)))
@@ -1,602 +1,219 @@
 import os
-import cv2
-import numpy as np
-from flask import Flask, render_template, request, jsonify, send_file
-from werkzeug.utils import secure_filename
-from PIL import Image
-import imutils
-from datetime import datetime
+import sys
 import json
-import base64
+import random
+from flask import Flask, Request, Response, render_template, request, jsonify, send_file
+from datetime import datetime
+from concurrent.futures import CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from io import BytesIO
 
-try:
-    import pytz
-except ImportError:
-    pytz = None
-
-app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['STATIC_FOLDER'] = 'static'
-
-# Create directories if they don't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['STATIC_FOLDER'], exist_ok=True)
+# The analysis engine has no Flask dependency; OpenCV and NumPy load with
+# the first analysis (or warm_up), not at import
+from ghostcore import (ALLOWED_EXTENSIONS, DeadlineExceeded, DeadlineScheduler, GhostCoreAI, QueueFullError,
+                       decode_image)
 
-class GhostCoreAI:
-    def __init__(self):
-        self.name = "GHOST CORE AI v.UM.100"
-        self.version = "Multiversal Precision Prediction Bot"
-        
-    def analyze_chart(self, image_path):
-        """Main analysis function for chart screenshot"""
-        try:
-            # Load and preprocess image
-            image = cv2.imread(image_path)
-            if image is None:
-                return {"error": "Could not load image"}
-            
-            # Get chart analysis
-            candles = self.detect_candles(image)
-            prediction = self.generate_prediction(candles, image)
-            debug_image = self.create_debug_overlay(image, candles, prediction)
-            
-            # Save debug image
-            debug_path = os.path.join(app.config['STATIC_FOLDER'], 'debug_analysis.png')
-            cv2.imwrite(debug_path, debug_image)
-            
-            return prediction
-            
-        except Exception as e:
-            return {"error": f"Analysis failed: {str(e)}"}
+class _UploadBuffer(BytesIO):
+    """In-memory upload stream whose buffer may still be borrowed when the request closes"""
     
-    def detect_candles(self, image):
-        """Detect candlesticks using OpenCV without OCR"""
-        try:
-            height, width = image.shape[:2]
-            
-            # Preprocess image to improve detection
-            # Apply Gaussian blur to reduce noise
-            blurred = cv2.GaussianBlur(image, (3, 3), 0)
-            
-            # Convert to HSV for better color detection
-            hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-            
-            # Enhance saturation and value channels
-            hsv[:,:,1] = cv2.multiply(hsv[:,:,1], 1.2)  # Increase saturation
-            hsv[:,:,2] = cv2.multiply(hsv[:,:,2], 1.1)  # Increase brightness
-            
-        except Exception as e:
-            print(f"Error in color conversion: {e}")
-            return []
-        
-        # Define more precise color ranges for green and red candles
-        # Green candles - more restrictive range
-        green_lower = np.array([45, 80, 80])
-        green_upper = np.array([75, 255, 255])
-        
-        # Red candles - more restrictive range to avoid false positives
-        red_lower1 = np.array([0, 80, 80])
-        red_upper1 = np.array([8, 255, 255])
-        red_lower2 = np.array([172, 80, 80])
-        red_upper2 = np.array([180, 255, 255])
-        
-        # Create masks
-        green_mask = cv2.inRange(hsv, green_lower, green_upper)
-        red_mask1 = cv2.inRange(hsv, red_lower1, red_upper1)
-        red_mask2 = cv2.inRange(hsv, red_lower2, red_upper2)
-        red_mask = cv2.bitwise_or(red_mask1, red_mask2)
-        
-        # Enhanced morphological operations to clean up
-        # Use different kernel sizes for better cleaning
-        kernel_small = np.ones((2,2), np.uint8)
-        kernel_medium = np.ones((3,3), np.uint8)
-        
-        # Remove small noise first
-        green_mask = cv2.morphologyEx(green_mask, cv2.MORPH_OPEN, kernel_small)
-        red_mask = cv2.morphologyEx(red_mask, cv2.MORPH_OPEN, kernel_small)
-        
-        # Fill gaps in candle bodies
-        green_mask = cv2.morphologyEx(green_mask, cv2.MORPH_CLOSE, kernel_medium)
-        red_mask = cv2.morphologyEx(red_mask, cv2.MORPH_CLOSE, kernel_medium)
-        
-        # Remove very thin horizontal lines that might be grid lines
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1))
-        green_mask = cv2.morphologyEx(green_mask, cv2.MORPH_OPEN, horizontal_kernel)
-        red_mask = cv2.morphologyEx(red_mask, cv2.MORPH_OPEN, horizontal_kernel)
-        
-        # Find contours
+    def close(self):
         try:
-            green_contours, _ = cv2.findContours(green_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            red_contours, _ = cv2.findContours(red_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        except Exception as e:
-            print(f"Error finding contours: {e}")
-            return []
-        
-        candles = []
-        
-        # Process green candles with enhanced validation
-        for contour in green_contours:
-            area = cv2.contourArea(contour)
-            if area > 100:  # Increased threshold to filter more noise
-                x, y, w, h = cv2.boundingRect(contour)
-                if self.is_valid_candle(w, h, height, area):
-                    # Additional validation: check if it's a solid rectangular shape
-                    aspect_ratio = h / w if w > 0 else 0
-                    if aspect_ratio >= 1.5:  # Candles should be taller than wide
-                        candles.append({
-                            'type': 'bullish',
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'center_x': x + w//2,
-                            'body_ratio': w/h if h > 0 else 0,
-                            'area': area,
-                            'aspect_ratio': aspect_ratio
-                        })
-        
-        # Process red candles with enhanced validation
-        for contour in red_contours:
-            area = cv2.contourArea(contour)
-            if area > 100:  # Increased threshold to filter more noise
-                x, y, w, h = cv2.boundingRect(contour)
-                if self.is_valid_candle(w, h, height, area):
-                    # Additional validation: check if it's a solid rectangular shape
-                    aspect_ratio = h / w if w > 0 else 0
-                    if aspect_ratio >= 1.5:  # Candles should be taller than wide
-                        candles.append({
-                            'type': 'bearish',
-                            'x': x, 'y': y, 'width': w, 'height': h,
-                            'center_x': x + w//2,
-                            'body_ratio': w/h if h > 0 else 0,
-                            'area': area,
-                            'aspect_ratio': aspect_ratio
-                        })
-        
-        # Sort candles by x position (time order)
-        candles.sort(key=lambda c: c['center_x'])
-        
-        return candles[-8:] if len(candles) > 8 else candles  # Last 8 candles max
-    
-    def is_valid_candle(self, width, height, image_height, area):
-        """Filter valid candle shapes with enhanced criteria"""
-        # Basic geometry filters
-        if height < 8 or width < 3:  # Minimum size requirements
-            return False
-        if height > image_height * 0.6:  # Too tall (reduced from 0.8)
-            return False
-        if width > height:  # Width should never exceed height for candles
-            return False
-        if area < width * height * 0.6:  # Area should be substantial relative to bounding box
-            return False
-        
-        # Additional shape validation
-        aspect_ratio = height / width if width > 0 else 0
-        if aspect_ratio < 1.5 or aspect_ratio > 20:  # Reasonable aspect ratio range
-            return False
-            
-        return True
-    
-    def generate_prediction(self, candles, image):
-        """Generate trading signal based on candle analysis"""
-        # Need at least 3 valid candles for basic analysis
-        if len(candles) < 3:
-            return {
-                "signal": "NO SIGNAL",
-                "confidence": 0,
-                "reason": f"Insufficient candle data - need 3+ candles, found {len(candles)}",
-                "analysis": {"candles_detected": len(candles)}
-            }
-        
-        # Use available candles (minimum 3, maximum 8)
-        recent_candles = candles[-6:] if len(candles) >= 6 else candles
-        
-        # Initialize analysis
-        analysis = {
-            "trend": "Unknown",
-            "pattern": "None", 
-            "momentum": "Neutral",
-            "support_resistance": "None",
-            "signal_strength": 0
-        }
-        
-        signal_strength = 0
-        
-        # 1. Pattern Detection (flexible scoring)
-        pattern_result = self.detect_patterns(recent_candles)
-        analysis['pattern'] = pattern_result['pattern']
-        signal_strength += pattern_result['score']
-        
-        # 2. Momentum Analysis
-        momentum_result = self.analyze_momentum(recent_candles)
-        analysis['momentum'] = momentum_result['momentum']
-        signal_strength += momentum_result['score']
-        
-        # 3. Trend Analysis
-        trend_result = self.analyze_trend(recent_candles)
-        analysis['trend'] = trend_result['trend']
-        signal_strength += trend_result['score']
-        
-        # 4. Support/Resistance
-        sr_result = self.analyze_support_resistance(recent_candles)
-        analysis['support_resistance'] = sr_result['level']
-        signal_strength += sr_result['score']
-        
-        # 5. Quality bonus
-        quality_bonus = self.calculate_quality_bonus(recent_candles)
-        signal_strength += quality_bonus
-        
-        # Calculate confidence (0-100%)
-        max_possible_score = 80  # Realistic maximum
-        confidence = min((signal_strength / max_possible_score) * 100, 100)
-        
-        # Determine signal based on analysis
-        signal = self.determine_signal(recent_candles, analysis, confidence)
-        
-        # Get current Bangladesh time
-        if pytz:
-            bd_tz = pytz.timezone('Asia/Dhaka')
-            current_time = datetime.now(bd_tz)
-        else:
-            current_time = datetime.now()
-        
-        return {
-            "signal": signal,
-            "confidence": round(confidence, 1),
-            "timeframe": "1 Minute",
-            "local_time": current_time.strftime("%H:%M (UTC+6)"),
-            "trend": analysis['trend'],
-            "pattern": analysis['pattern'],
-            "momentum": analysis['momentum'],
-            "support_resistance": analysis['support_resistance'],
-            "candle_count": len(recent_candles),
-            "signal_strength": round(signal_strength, 1),
-            "analysis": analysis
-        }
-    
-    def detect_reversal_patterns(self, candles):
-        """Detect reversal patterns with enhanced accuracy"""
-        if len(candles) < 2:
-            return {"score": 0, "pattern": "None"}
-        
-        last_candle = candles[-1]
-        prev_candle = candles[-2]
-        
-        # Enhanced Engulfing Pattern Detection
-        if (last_candle['type'] != prev_candle['type'] and 
-            last_candle['height'] > prev_candle['height'] * 1.4 and  # Stricter size requirement
-            last_candle['area'] > prev_candle['area'] * 1.3):  # Volume confirmation
-            
-            # Additional validation: check position overlap
-            prev_top = prev_candle['y']
-            prev_bottom = prev_candle['y'] + prev_candle['height']
-            last_top = last_candle['y']
-            last_bottom = last_candle['y'] + last_candle['height']
-            
-            # True engulfing: last candle should engulf previous candle
-            if last_top <= prev_top and last_bottom >= prev_bottom:
-                pattern_name = f"{last_candle['type'].title()} Engulfing"
-                return {"score": 30, "pattern": pattern_name}
-        
-        # Enhanced Pin Bar Detection
-        if (last_candle['body_ratio'] < 0.25 and  # Stricter body ratio
-            last_candle['height'] > 20):  # Minimum height requirement
-            
-            # Check if it's at a significant level (compare with previous candles)
-            if len(candles) >= 3:
-                prev_avg_height = sum(c['height'] for c in candles[-3:-1]) / 2
-                if last_candle['height'] > prev_avg_height * 1.2:  # Stands out
-                    pattern_name = f"{last_candle['type'].title()} Pin Bar"
-                    return {"score": 25, "pattern": pattern_name}
-        
-        # Enhanced Doji Detection
-        if (last_candle['body_ratio'] < 0.15 and 
-            last_candle['height'] > 15):  # Must have meaningful size
-            return {"score": 18, "pattern": "Doji"}
-        
-        return {"score": 0, "pattern": "None"}
-    
-    def analyze_color_momentum(self, candles):
-        """Analyze momentum based on candle colors"""
-        if len(candles) < 3:
-            return {"score": 0, "momentum": "Neutral"}
-        
-        bullish_count = sum(1 for c in candles if c['type'] == 'bullish')
-        bearish_count = len(candles) - bullish_count
-        
-        # Strong momentum
-        if bullish_count >= len(candles) * 0.7:
-            return {"score": 18, "momentum": "Strong Bullish"}
-        elif bearish_count >= len(candles) * 0.7:
-            return {"score": 18, "momentum": "Strong Bearish"}
-        
-        # Recent momentum change
-        recent_3 = candles[-3:]
-        recent_bullish = sum(1 for c in recent_3 if c['type'] == 'bullish')
-        
-        if recent_bullish >= 2:
-            return {"score": 12, "momentum": "Bullish Shift"}
-        elif recent_bullish <= 1:
-            return {"score": 12, "momentum": "Bearish Shift"}
-        
-        return {"score": 5, "momentum": "Neutral"}
-    
-    def analyze_trend_pattern(self, candles):
-        """Analyze trend patterns (Higher Highs/Lows, Lower Highs/Lows)"""
-        if len(candles) < 3:
-            return {"score": 0, "trend": "Unknown"}
-        
-        # Simple trend analysis based on y positions
-        highs = [c['y'] for c in candles]  # y increases downward in image
-        lows = [c['y'] + c['height'] for c in candles]
-        
-        # Check for trend
-        if len(highs) >= 3:
-            recent_highs = highs[-3:]
-            recent_lows = lows[-3:]
-            
-            # Downtrend (lower highs, lower lows)
-            if (recent_highs[0] < recent_highs[1] < recent_highs[2] and
-                recent_lows[0] < recent_lows[1] < recent_lows[2]):
-                return {"score": 15, "trend": "Strong Downtrend"}
-            
-            # Uptrend (higher highs, higher lows)
-            if (recent_highs[0] > recent_highs[1] > recent_highs[2] and
-                recent_lows[0] > recent_lows[1] > recent_lows[2]):
-                return {"score": 15, "trend": "Strong Uptrend"}
-        
-        return {"score": 8, "trend": "Sideways"}
-    
-    def analyze_support_resistance(self, candles):
-        """Basic support/resistance analysis"""
-        if len(candles) < 4:
-            return {"score": 0, "level": "None"}
-        
-        # Look for similar price levels (y positions)
-        y_positions = [c['y'] + c['height']//2 for c in candles]
-        
-        # Check for clustering around similar levels
-        for i in range(len(y_positions)-1):
-            matches = sum(1 for y in y_positions if abs(y - y_positions[i]) < 10)
-            if matches >= 3:
-                return {"score": 15, "level": "Key Level Touch"}
-        
-        return {"score": 5, "level": "Minor Level"}
-    
-    def noise_filter(self, candles):
-        """Filter out false signals"""
-        if len(candles) < 2:
-            return 0
-        
-        # Check for very small candles (likely noise)
-        small_candles = sum(1 for c in candles if c['height'] < 15)
-        if small_candles > len(candles) * 0.5:
-            return -5  # Penalty for too much noise
-        
-        return 8  # Clean candles bonus
-    
-    def validate_candle_quality(self, candles):
-        """Validate that detected candles are reasonable"""
-        if len(candles) < 2:
-            return False
-        
-        # Check candle size consistency
-        heights = [c['height'] for c in candles]
-        avg_height = sum(heights) / len(heights)
-        
-        # Reject if candles are too small (likely noise)
-        if avg_height < 12:  # More lenient
-            return False
-        
-        # Validate candle spacing if we have enough candles
-        if len(candles) >= 3:
-            x_positions = [c['center_x'] for c in candles]
-            spacings = [x_positions[i+1] - x_positions[i] for i in range(len(x_positions)-1)]
-            avg_spacing = sum(spacings) / len(spacings)
-            
-            # Check if spacings are reasonable (more lenient)
-            if avg_spacing < 5 or avg_spacing > 300:
-                return False
-        
-        return True
-    
-    def detect_patterns(self, candles):
-        """Detect trading patterns with realistic scoring"""
-        if len(candles) < 2:
-            return {"score": 0, "pattern": "None"}
-        
-        last_candle = candles[-1]
-        prev_candle = candles[-2]
-        
-        # Engulfing Pattern (relaxed criteria)
-        if (last_candle['type'] != prev_candle['type'] and 
-            last_candle['height'] > prev_candle['height'] * 1.2):
-            
-            prev_top = prev_candle['y']
-            prev_bottom = prev_candle['y'] + prev_candle['height']
-            last_top = last_candle['y']
-            last_bottom = last_candle['y'] + last_candle['height']
-            
-            # Check for engulfing (some overlap allowed)
-            if (last_top <= prev_top + 5 and last_bottom >= prev_bottom - 5):
-                pattern_name = f"{last_candle['type'].title()} Engulfing"
-                return {"score": 25, "pattern": pattern_name}
-        
-        # Pin Bar Pattern
-        if last_candle['body_ratio'] < 0.3 and last_candle['height'] > 15:
-            pattern_name = f"{last_candle['type'].title()} Pin Bar"
-            return {"score": 20, "pattern": pattern_name}
-        
-        # Doji Pattern
-        if last_candle['body_ratio'] < 0.2:
-            return {"score": 15, "pattern": "Doji"}
-        
-        # Consecutive candles (momentum)
-        if len(candles) >= 3:
-            last_3 = candles[-3:]
-            same_type_count = sum(1 for c in last_3 if c['type'] == last_candle['type'])
-            
-            if same_type_count >= 2:
-                pattern_name = f"{last_candle['type'].title()} Momentum"
-                return {"score": 18, "pattern": pattern_name}
-        
-        # Large candle (breakout potential)
-        if len(candles) >= 3:
-            avg_height = sum(c['height'] for c in candles[-3:-1]) / 2
-            if last_candle['height'] > avg_height * 1.4:
-                pattern_name = f"Large {last_candle['type'].title()} Candle"
-                return {"score": 15, "pattern": pattern_name}
-        
-        # Small pattern (consolidation)
-        return {"score": 8, "pattern": "Standard Candle"}
-    
-    def analyze_momentum(self, candles):
-        """Analyze momentum with flexible scoring"""
-        if len(candles) < 3:
-            return {"score": 5, "momentum": "Limited Data"}
-        
-        # Count candle types in available data
-        bullish_count = sum(1 for c in candles if c['type'] == 'bullish')
-        bearish_count = len(candles) - bullish_count
-        
-        # Strong momentum (70%+ same direction)
-        if bullish_count >= len(candles) * 0.7:
-            return {"score": 20, "momentum": "Strong Bullish"}
-        elif bearish_count >= len(candles) * 0.7:
-            return {"score": 20, "momentum": "Strong Bearish"}
-        
-        # Moderate momentum (60%+ same direction)
-        if bullish_count >= len(candles) * 0.6:
-            return {"score": 15, "momentum": "Bullish"}
-        elif bearish_count >= len(candles) * 0.6:
-            return {"score": 15, "momentum": "Bearish"}
-        
-        # Recent momentum (last 3 candles)
-        if len(candles) >= 3:
-            recent_3 = candles[-3:]
-            recent_bullish = sum(1 for c in recent_3 if c['type'] == 'bullish')
-            
-            if recent_bullish >= 2:
-                return {"score": 12, "momentum": "Recent Bullish"}
-            elif recent_bullish <= 1:
-                return {"score": 12, "momentum": "Recent Bearish"}
-        
-        return {"score": 8, "momentum": "Neutral"}
+            super().close()
+        except BufferError:
+            # An analysis still holds a view (e.g. one that outlived its timeout);
+            # the buffer is freed with that view instead
+            pass
+
+class InMemoryRequest(Request):
+    """Keeps file uploads in memory instead of spooling large ones to a temp file
     
-    def analyze_trend(self, candles):
-        """Analyze trend with flexible criteria"""
-        if len(candles) < 3:
-            return {"score": 5, "trend": "Limited Data"}
-        
-        # Use candle positions for trend analysis
-        positions = [c['y'] + c['height']//2 for c in candles]
-        
-        if len(positions) >= 3:
-            # Compare first and last thirds
-            first_third = positions[:len(positions)//3] if len(positions) >= 3 else [positions[0]]
-            last_third = positions[-len(positions)//3:] if len(positions) >= 3 else [positions[-1]]
-            
-            avg_first = sum(first_third) / len(first_third)
-            avg_last = sum(last_third) / len(last_third)
-            
-            diff = avg_last - avg_first
-            
-            # Trend detection (more lenient)
-            if diff > 8:
-                return {"score": 15, "trend": "Downtrend"}
-            elif diff < -8:
-                return {"score": 15, "trend": "Uptrend"}
-            else:
-                return {"score": 10, "trend": "Sideways"}
-        
-        return {"score": 8, "trend": "Neutral"}
+    MAX_CONTENT_LENGTH bounds the memory an upload can take.
+    """
     
-    def calculate_quality_bonus(self, candles):
-        """Calculate bonus points for candle quality"""
-        if len(candles) < 2:
-            return 0
-        
-        # Size consistency bonus
-        heights = [c['height'] for c in candles]
-        avg_height = sum(heights) / len(heights)
-        
-        if avg_height > 20:  # Good sized candles
-            return 5
-        elif avg_height > 15:  # Decent sized candles
-            return 3
-        
-        return 0
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return _UploadBuffer()
+
+app = Flask(__name__)
+app.request_class = InMemoryRequest
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['BATCH_WORKERS'] = os.cpu_count() or 1  # Worker processes for /analyze-batch
+app.config['BATCH_MAX_FILES'] = 64  # Images one /analyze-batch request may upload
+app.config['BATCH_MAX_DECODED_BYTES'] = 512 * 1024 * 1024  # Decoded pixels one batch may hold, None for no limit
+app.config['CACHE_SIZE'] = 256  # Entries per result cache tier, 0 disables caching
+app.config['CACHE_TTL'] = 60  # Seconds a cached analysis stays valid
+app.config['CACHE_HASH_SIZE'] = 32  # Perceptual hash grid (N x N gradient bits per channel)
+app.config['DEBUG_STORE_SIZE'] = 64  # Analyses whose overlay can still be rendered
+app.config['DEBUG_STORE_MAX_BYTES'] = 256 * 1024 * 1024  # Upload bytes those analyses may hold, None for no limit
+app.config['DEBUG_IMAGE_FORMAT'] = 'png'  # png, jpeg or webp
+app.config['DEBUG_IMAGE_QUALITY'] = 90  # jpeg/webp quality
+app.config['DEBUG_IMAGE_MAX_SIZE'] = None  # Longest overlay side in pixels, None keeps full size
+app.config['STREAM_MAX_SESSIONS'] = 32  # Concurrent live-frame sessions
+app.config['STREAM_SESSION_TTL'] = 300  # Seconds an idle live-frame session is kept
+app.config['ROI_DETECTION'] = True  # Restrict detection to the detected chart plotting area
+app.config['ROI_CACHE_SIZE'] = 64  # Screen layouts whose chart region is remembered
+app.config['ANALYSIS_WORKERS'] = os.cpu_count() or 1  # Threads running the OpenCV pipeline
+app.config['ANALYSIS_QUEUE_DEPTH'] = 16  # Analyses allowed to wait for a worker before 503
+app.config['ANALYSIS_TIMEOUT'] = 30  # Seconds a request waits for its analysis (and its default deadline)
+app.config['ANALYSIS_MAX_AGE'] = 30  # Seconds after the capture time an analysis is still worth running
+app.config['DEGRADE_QUEUE_DEPTH'] = 4  # Waiting analyses that switch new picks to the fast path, None never
+app.config['DEGRADED_WORK_HEIGHT'] = 480  # Working height of the fast path (which also skips the overlay)
+app.config['SERVER_THREADS'] = 32  # Request threads in production mode
+app.config['WORK_HEIGHT'] = 720  # Taller frames are downscaled to this height for analysis, None disables
+app.config['HISTORY_DIR'] = 'history'  # Append-only prediction log, None disables
+app.config['BUFFER_POOL_SHAPES'] = 2  # Frame sizes whose scratch buffers each thread keeps, 0 disables
+app.config['CANDLE_EXTRACTOR'] = 'contours'  # contours (bodies only) or profile (bodies and wicks)
+app.config['LOOKBACK'] = 8  # Candles kept per chart, None keeps all (deep trend and levels past 8)
+app.config['PROGRESSIVE_SCAN'] = False  # Scan from the right edge and stop once LOOKBACK candles are found
+app.config['TRIAGE'] = True  # Reject uploads that do not look like candlestick charts before detection
+app.config['TRIAGE_MIN_COLOR'] = 0.002  # Least share of green/red candle pixels a chart has
+app.config['TRIAGE_MAX_COLOR'] = 0.35  # Larger shares are photos or graphics, not charts
+app.config['TRIAGE_MIN_BARS'] = 3  # Upright green/red bars a chart must show
+app.config['PROFILE_DIR'] = 'profiles'  # Ring buffer of profiled analyses, None disables profiling
+app.config['PROFILE_MAX'] = 32  # Profiles kept; the oldest is deleted beyond this
+app.config['PROFILE_SAMPLE_RATE'] = 0.0  # Share of /analyze requests profiled without asking
+app.config['WARM_UP'] = True  # Load OpenCV and run a dummy analysis before serving traffic
+
+def _build_analyzer(config, degraded=False, metrics=None):
+    """The analyzer for config; degraded builds the fast-path one (lower height, no overlays)
     
-    def determine_signal(self, candles, analysis, confidence):
-        """Determine final signal based on analysis"""
-        # Minimum confidence threshold
-        if confidence < 45:
-            return "NO SIGNAL"
-        
-        last_candle = candles[-1]
-        
-        # Priority 1: Strong patterns
-        if "Engulfing" in analysis['pattern']:
-            if "Bullish" in analysis['pattern']:
-                return "CALL"
-            elif "Bearish" in analysis['pattern']:
-                return "PUT"
-        
-        # Priority 2: Pin bars (reversal signals)
-        if "Pin Bar" in analysis['pattern']:
-            if "Bullish" in analysis['pattern']:
-                return "CALL"
-            elif "Bearish" in analysis['pattern']:
-                return "PUT"
-        
-        # Priority 3: Momentum signals
-        if confidence >= 60:
-            if "Bullish" in analysis['momentum']:
-                return "CALL" 
-            elif "Bearish" in analysis['momentum']:
-                return "PUT"
-        
-        # Priority 4: Last candle direction (if confidence is decent)
-        if confidence >= 55:
-            if last_candle['type'] == 'bullish':
-                return "CALL"
-            elif last_candle['type'] == 'bearish':
-                return "PUT"
-        
-        return "NO SIGNAL"
+    metrics is a PipelineMetrics to record into, so /metrics also covers the fast path.
+    """
+    return GhostCoreAI(workers=config['BATCH_WORKERS'],
+                       cache_size=config['CACHE_SIZE'],
+                       cache_ttl=config['CACHE_TTL'],
+                       cache_hash_size=config['CACHE_HASH_SIZE'],
+                       debug_store_size=0 if degraded else config['DEBUG_STORE_SIZE'],
+                       debug_store_bytes=config['DEBUG_STORE_MAX_BYTES'],
+                       debug_format=config['DEBUG_IMAGE_FORMAT'],
+                       debug_quality=config['DEBUG_IMAGE_QUALITY'],
+                       debug_max_size=config['DEBUG_IMAGE_MAX_SIZE'],
+                       stream_max_sessions=config['STREAM_MAX_SESSIONS'],
+                       stream_session_ttl=config['STREAM_SESSION_TTL'],
+                       roi_detection=config['ROI_DETECTION'],
+                       roi_cache_size=config['ROI_CACHE_SIZE'],
+                       work_height=config['DEGRADED_WORK_HEIGHT'] if degraded else config['WORK_HEIGHT'],
+                       history_dir=config['HISTORY_DIR'],
+                       buffer_shapes=config['BUFFER_POOL_SHAPES'],
+                       extractor=config['CANDLE_EXTRACTOR'],
+                       lookback=config['LOOKBACK'],
+                       progressive=config['PROGRESSIVE_SCAN'],
+                       triage=config['TRIAGE'],
+                       triage_min_color=config['TRIAGE_MIN_COLOR'],
+                       triage_max_color=config['TRIAGE_MAX_COLOR'],
+                       triage_min_bars=config['TRIAGE_MIN_BARS'],
+                       profile_dir=None if degraded else config['PROFILE_DIR'],
+                       profile_max=config['PROFILE_MAX'],
+                       metrics=metrics,
+                       batch_max_files=config['BATCH_MAX_FILES'],
+                       batch_max_decoded_bytes=config['BATCH_MAX_DECODED_BYTES'])
+
+# Initialize AI (cheap: heavy modules load with the first analysis)
+ghost_ai = _build_analyzer(app.config)
+fast_ai = _build_analyzer(app.config, degraded=True, metrics=ghost_ai.metrics)
+
+def _build_scheduler(config):
+    # Earliest deadline first; stale analyses are dropped, a backed-up queue takes the fast path
+    return DeadlineScheduler(config['ANALYSIS_WORKERS'], config['ANALYSIS_QUEUE_DEPTH'],
+                             default_budget=config['ANALYSIS_TIMEOUT'],
+                             degrade_depth=config['DEGRADE_QUEUE_DEPTH'])
+
+analysis_executor = _build_scheduler(app.config)
+
+def create_app(config=None, warm_up=None):
+    """App factory: apply config overrides, optionally warm up, and return the app
     
+    Overrides rebuild the analyzers and scheduler from the updated config.
+    warm_up defaults to the WARM_UP setting; when enabled OpenCV is loaded
+    and a dummy analysis runs before the app is handed to a server.
+    """
+    global ghost_ai, fast_ai, analysis_executor
+    if config:
+        app.config.update(config)
+        ghost_ai.close()
+        fast_ai.close()
+        ghost_ai = _build_analyzer(app.config)
+        fast_ai = _build_analyzer(app.config, degraded=True, metrics=ghost_ai.metrics)
+        analysis_executor.shutdown(wait=False)
+        analysis_executor = _build_scheduler(app.config)
+    if app.config['WARM_UP'] if warm_up is None else warm_up:
+        elapsed = ghost_ai.warm_up() + fast_ai.warm_up()
+        print(f"Warm-up finished in {elapsed * 1000:.0f} ms")
+    return app
+
+def _run_analysis(fn, *args, deadline=None, fallback=None, respond=jsonify, kind='analysis', **kwargs):
+    """Run CV work on the scheduler; returns a response for busy, stale or timed-out requests
     
+    The job's result is turned into the response by respond, on the request thread.
+    kind groups the jobs whose run times the scheduler estimates together.
+    """
+    try:
+        future = analysis_executor.submit(fn, *args, deadline=deadline, fallback=fallback, kind=kind, **kwargs)
+    except QueueFullError:
+        response = jsonify({'error': 'Server busy, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    try:
+        return respond(future.result(timeout=app.config['ANALYSIS_TIMEOUT']))
+    except (DeadlineExceeded, CancelledError):
+        response = jsonify({'error': 'Deadline passed before the analysis could finish'})
+        response.status_code = 504
+        return response
+    except FutureTimeoutError:
+        future.cancel()
+        response = jsonify({'error': 'Analysis timed out'})
+        response.status_code = 504
+        return response
+
+def _analyze_degraded(buf, timings):
+    """Fast path for a backed-up queue: a downscaled frame and no overlay"""
+    prediction = fast_ai.analyze_bytes(buf, debug=False, timings=timings)
+    prediction['degraded'] = True
+    return prediction
+
+def _upload_buffer(file):
+    """Return the upload contents, borrowing the in-memory buffer when possible"""
+    stream = file.stream
+    if hasattr(stream, 'getbuffer'):
+        # InMemoryRequest keeps every upload in a BytesIO; expose it without copying
+        return stream.getbuffer()
+    return stream.read()
+
+def _parse_time(value):
+    """Unix seconds or an ISO 8601 timestamp from a query string"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def _request_deadline():
+    """Deadline from a deadline or captured_at field (Unix seconds or ISO 8601), else None
     
-    def create_debug_overlay(self, image, candles, prediction):
-        """Create debug overlay image with analysis"""
-        debug_img = image.copy()
-        
-        # Draw detected candles
-        for i, candle in enumerate(candles):
-            color = (0, 255, 0) if candle['type'] == 'bullish' else (0, 0, 255)
-            cv2.rectangle(debug_img, 
-                         (candle['x'], candle['y']), 
-                         (candle['x'] + candle['width'], candle['y'] + candle['height']), 
-                         color, 2)
-            
-            # Add candle number
-            cv2.putText(debug_img, str(i+1), 
-                       (candle['x'], candle['y']-5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-        
-        # Add prediction text
-        signal_color = (0, 255, 255) if prediction['signal'] == 'CALL' else (255, 0, 255)
-        if prediction['signal'] == 'NO SIGNAL':
-            signal_color = (128, 128, 128)
-            
-        cv2.putText(debug_img, f"Signal: {prediction['signal']}", 
-                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, signal_color, 2)
-        cv2.putText(debug_img, f"Confidence: {prediction['confidence']}%", 
-                   (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
-        return debug_img
+    A capture time allows ANALYSIS_MAX_AGE seconds; without either the
+    scheduler gives the job ANALYSIS_TIMEOUT seconds from now.
+    """
+    deadline = _parse_time(request.args.get('deadline') or request.form.get('deadline'))
+    if deadline is not None:
+        return deadline
+    captured_at = _parse_time(request.args.get('captured_at') or request.form.get('captured_at'))
+    if captured_at is not None:
+        return captured_at + app.config['ANALYSIS_MAX_AGE']
+    return None
 
-# Initialize AI
-ghost_ai = GhostCoreAI()
+def _wants_timings():
+    """Per-request stage timings are opt-in via ?timings=1 or a form field"""
+    value = request.args.get('timings') or request.form.get('timings') or ''
+    return value.lower() in ('1', 'true', 'yes')
+
+def _wants_profile():
+    # Opted in with an X-Profile header or profile flag, otherwise sampled
+    value = request.headers.get('X-Profile') or request.args.get('profile') or request.form.get('profile') or ''
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
 
 @app.route('/')
 def index():
@@ -613,43 +230,221 @@ def analyze_chart():
             return jsonify({'error': 'No file selected'})
         
         # Check file type
-        if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff')):
+        if not file.filename.lower().endswith(ALLOWED_EXTENSIONS):
             return jsonify({'error': 'Unsupported file format. Please use PNG, JPG, or other image formats.'})
         
-        if file:
-            # Secure filename and save
-            filename = secure_filename(file.filename)
-            if not filename:
-                filename = 'chart_image.png'
-            
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+        try:
+            # Decode straight from the upload stream, nothing is written to disk
+            with ghost_ai.metrics.stage('upload'):
+                buf = _upload_buffer(file)
+            timings = _wants_timings()
+            analyze = ghost_ai.analyze_bytes_profiled if _wants_profile() else ghost_ai.analyze_bytes
+            # The request thread only parses and validates; OpenCV work runs on the scheduler
+            return _run_analysis(analyze, buf, timings=timings, deadline=_request_deadline(),
+                                 fallback=lambda: _analyze_degraded(buf, timings))
             
-            try:
-                # Analyze the chart
-                result = ghost_ai.analyze_chart(filepath)
-                
-                # Clean up uploaded file
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                
-                return jsonify(result)
-                
-            except Exception as e:
-                # Clean up on error
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                return jsonify({'error': f'Analysis failed: {str(e)}'})
+        except Exception as e:
+            return jsonify({'error': f'Analysis failed: {str(e)}'})
+    
+    except Exception as e:
+        return jsonify({'error': f'Request processing failed: {str(e)}'})
+
+@app.route('/analyze-panels', methods=['POST'])
+def analyze_panels():
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'})
+        
+        file = request.files['file']
+        if not file.filename.lower().endswith(ALLOWED_EXTENSIONS):
+            return jsonify({'error': 'Unsupported file format. Please use PNG, JPG, or other image formats.'})
+        
+        # One prediction per chart panel; panels run concurrently inside the analysis
+        buf = _upload_buffer(file)
+        return _run_analysis(ghost_ai.analyze_panels_bytes, buf, timings=_wants_timings(),
+                             deadline=_request_deadline(), kind='panels')
+    
+    except Exception as e:
+        return jsonify({'error': f'Request processing failed: {str(e)}'})
+
+@app.route('/analyze-batch', methods=['POST'])
+def analyze_batch():
+    try:
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files:
+            return jsonify({'error': 'No files uploaded'})
+        if len(files) > app.config['BATCH_MAX_FILES']:
+            return jsonify({'error': f"Too many files, at most {app.config['BATCH_MAX_FILES']} per batch"})
+        
+        results = [None] * len(files)
+        buffers = []
+        for i, file in enumerate(files):
+            if not file.filename.lower().endswith(ALLOWED_EXTENSIONS):
+                results[i] = {'error': 'Unsupported file format. Please use PNG, JPG, or other image formats.'}
+            else:
+                buffers.append((i, _upload_buffer(file)))
+        
+        def respond(analyzed):
+            for (i, _), result in zip(buffers, analyzed):
+                results[i] = result
+            for file, result in zip(files, results):
+                result['filename'] = file.filename
+            return jsonify({'count': len(results), 'results': results})
+        
+        # Decoding and analysis run on the scheduler like single uploads, so a
+        # burst of batches queues (or gets a 503) instead of tying up request threads
+        try:
+            return _run_analysis(ghost_ai.analyze_many, [buf for _, buf in buffers],
+                                 deadline=_request_deadline(), respond=respond, kind='batch')
+        except Exception as e:
+            return jsonify({'error': f'Analysis failed: {str(e)}'})
     
     except Exception as e:
         return jsonify({'error': f'Request processing failed: {str(e)}'})
 
+@app.route('/stream', methods=['POST'])
+def open_stream():
+    return jsonify({'session_id': ghost_ai.open_stream()})
+
+@app.route('/stream/<session_id>', methods=['DELETE'])
+def close_stream(session_id):
+    return jsonify({'closed': ghost_ai.close_stream(session_id)})
+
+@app.route('/stream/<session_id>/frame', methods=['POST'])
+def stream_frame(session_id):
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'})
+        buf = _upload_buffer(request.files['file'])
+        return _run_analysis(lambda: ghost_ai.stream_frame(session_id, decode_image(buf)),
+                             deadline=_request_deadline(), kind='stream')
+    
+    except Exception as e:
+        return jsonify({'error': f'Request processing failed: {str(e)}'})
+
+@app.route('/stream/<session_id>/events')
+def stream_events(session_id):
+    session = ghost_ai.get_stream(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired stream session'})
+    
+    def events():
+        # Server-sent events: one message per new prediction, comments as keep-alives
+        version = 0
+        while True:
+            current = session.wait(version, timeout=15)
+            if current == version:
+                if ghost_ai.get_stream(session_id) is None:
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            yield f"data: {json.dumps(session.prediction)}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def get_metrics():
+    # Cache counters are exported next to the pipeline metrics
+    hits, misses = {}, {}
+    for tier, stats in ghost_ai.cache_stats().items():
+        if 'hits' not in stats:
+            continue  # buffer pool counters, not a cache tier
+        hits[f'tier="{tier}"'] = stats['hits']
+        misses[f'tier="{tier}"'] = stats['misses']
+    executor = analysis_executor.stats()
+    body = ghost_ai.metrics.render_prometheus({
+        'ghostcore_cache_hits_total': ('counter', 'Cache hits by tier', hits),
+        'ghostcore_cache_misses_total': ('counter', 'Cache misses by tier', misses),
+        'ghostcore_executor_in_flight': ('gauge', 'Analyses running or queued', {'': executor['in_flight']}),
+        'ghostcore_executor_rejected_total': ('counter', 'Analyses rejected with 503', {'': executor['rejected']}),
+        'ghostcore_executor_completed_total': ('counter', 'Analyses completed by the executor', {'': executor['completed']}),
+        'ghostcore_scheduler_dropped_total': ('counter', 'Analyses dropped past their deadline', {'': executor['dropped']}),
+        'ghostcore_scheduler_degraded_total': ('counter', 'Analyses run on the fast path', {'': executor['degraded']}),
+        'ghostcore_scheduler_on_time_total': ('counter', 'Analyses finished by their deadline', {'': executor['on_time']}),
+        'ghostcore_scheduler_late_total': ('counter', 'Analyses finished after their deadline', {'': executor['late']}),
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/history')
+def query_history():
+    if ghost_ai.history is None:
+        return jsonify({'error': 'History is disabled'})
+    try:
+        summary = ghost_ai.history.query(
+            start=_parse_time(request.args.get('start')),
+            end=_parse_time(request.args.get('end')),
+            pattern=request.args.get('pattern') or None,
+            signal=request.args.get('signal') or None,
+            limit=max(0, min(request.args.get('limit', 0, type=int), 1000)),
+        )
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {str(e)}'})
+
+@app.route('/history/<int:record_id>/outcome', methods=['POST'])
+def record_outcome(record_id):
+    if ghost_ai.history is None:
+        return jsonify({'error': 'History is disabled'})
+    outcome = (request.form.get('outcome') or request.args.get('outcome') or '').lower()
+    try:
+        ghost_ai.history.record_outcome(record_id, outcome)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    return jsonify({'record_id': record_id, 'outcome': outcome})
+
+@app.route('/cache-stats')
+def get_cache_stats():
+    return jsonify(ghost_ai.cache_stats())
+
 @app.route('/debug-image')
-def get_debug_image():
-    debug_path = os.path.join(app.config['STATIC_FOLDER'], 'debug_analysis.png')
-    if os.path.exists(debug_path):
-        return send_file(debug_path, mimetype='image/png')
-    return jsonify({'error': 'No debug image available'})
+@app.route('/debug-image/<analysis_id>')
+def get_debug_image(analysis_id=None):
+    def respond(rendered):
+        if rendered is None:
+            return jsonify({'error': 'No debug image available'})
+        data, mimetype = rendered
+        return send_file(BytesIO(data), mimetype=mimetype)
+    
+    # Without an id, serve the most recent analysis; rendering is CV work for the scheduler
+    return _run_analysis(ghost_ai.render_debug_image, analysis_id or ghost_ai.last_analysis_id,
+                         respond=respond, kind='overlay')
+
+@app.route('/profiles')
+def list_profiles():
+    if ghost_ai.profiles is None:
+        return jsonify({'error': 'Profiling is disabled'})
+    profiles = ghost_ai.profiles.list()
+    return jsonify({'count': len(profiles), 'profiles': profiles})
+
+@app.route('/profiles/<profile_id>')
+def get_profile(profile_id):
+    # pstats file: python -m pstats <file>, or snakeviz for a flame view
+    path = ghost_ai.profiles.path(profile_id) if ghost_ai.profiles is not None else None
+    if path is None:
+        return jsonify({'error': 'Unknown profile'})
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream',
+                     as_attachment=True, download_name=f'{profile_id}.prof')
+
+def serve(host='0.0.0.0', port=5000):
+    """Production serving: a threaded WSGI server without the debugger or reloader
+    
+    Request threads stay free for cheap routes because analyses run on the
+    deadline scheduler. waitress is used when installed, otherwise werkzeug's
+    threaded server.
+    """
+    create_app()
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        from werkzeug.serving import run_simple
+        run_simple(host, port, app, threaded=True)
+    else:
+        waitress_serve(app, host=host, port=port, threads=app.config['SERVER_THREADS'])
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    if '--production' in sys.argv or os.environ.get('GHOSTCORE_MODE') == 'production':
+        serve()
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=True)